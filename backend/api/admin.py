@@ -1,34 +1,134 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models.functions import Now
 
+from . import const, search, shopping_cart, versions
+from .ingredient_index import ingredient_index
 from .models import Cart, Favorite, Ingredient, IngredientAmount, Recipe, Tag
+from .pagination import EstimatedCountPaginator
+
+
+def get_amounts(recipe_ids):
+    """Состав рецептов до правки: {recipe_id: {ingredient_id: amount}}."""
+    return {
+        recipe_id: shopping_cart.get_recipe_amounts(recipe_id)
+        for recipe_id in recipe_ids
+    }
+
+
+def refresh_recipes(old_amounts):
+    """Списки покупок и поисковый индекс после правки состава в админке.
+
+    old_amounts — результат get_amounts до сохранения. Индекс не
+    обновляется сигналами строк IngredientAmount: иначе удаление рецепта
+    обновляло бы его по разу на каждый ингредиент. updated_at и версия
+    рецептов меняются, чтобы ETag карточек и списка стали другими.
+    """
+    for recipe_id, amounts in old_amounts.items():
+        shopping_cart.change_recipe(
+            recipe_id, amounts, shopping_cart.get_recipe_amounts(recipe_id)
+        )
+    search.update_index(list(old_amounts))
+    Recipe.objects.filter(pk__in=old_amounts).update(updated_at=Now())
+    versions.bump(versions.RECIPES)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список без полного подсчета строк для больших таблиц."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class RecipeIngredientInline(admin.TabularInline):
     model = IngredientAmount
     extra = 1
+    autocomplete_fields = ('ingredient',)
 
 
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(LargeTableAdmin):
     list_display = ('id', 'name', 'author', 'count_favorites',)
-    list_filter = ('name', 'author', 'tags',)
+    list_select_related = ('author',)
+    list_filter = ('tags',)
+    search_fields = ('name',)
+    autocomplete_fields = ('author', 'tags', 'ingredients',)
     inlines = (RecipeIngredientInline,)
 
+    def save_related(self, request, form, formsets, change):
+        old_amounts = get_amounts([form.instance.pk])
+        super().save_related(request, form, formsets, change)
+        refresh_recipes(old_amounts)
+
+    @admin.display(description='В избранном', ordering='favorites_count')
     def count_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по полнотекстовому индексу рецептов."""
+        if not search_term:
+            return queryset, False
+        return search.search_recipes(queryset, search_term), False
 
 
 class TagAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug', 'color',)
+    search_fields = ('name', 'slug',)
 
 
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(LargeTableAdmin):
     list_display = ('name', 'measurement_unit',)
-    list_filter = ('name',)
+    search_fields = ('name',)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по началу названия через индекс ингредиентов в памяти."""
+        if not search_term:
+            return queryset, False
+        ids = [
+            ingredient['id'] for ingredient in ingredient_index.search(
+                search_term, const.ADMIN_SEARCH_LIMIT
+            )
+        ]
+        return queryset.filter(pk__in=ids), False
+
+
+class UserRecipeAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'model_to_subscribe',)
+    list_select_related = ('user', 'model_to_subscribe',)
+    autocomplete_fields = ('user', 'model_to_subscribe',)
+
+
+class IngredientAmountAdmin(LargeTableAdmin):
+    list_display = ('id', 'recipe', 'ingredient', 'amount',)
+    list_select_related = ('recipe', 'ingredient',)
+    autocomplete_fields = ('recipe', 'ingredient',)
+
+    def save_model(self, request, obj, form, change):
+        recipe_ids = {obj.recipe_id}
+        if change:
+            # Строку могли перенести в другой рецепт.
+            recipe_ids.update(IngredientAmount.objects.filter(
+                pk=obj.pk
+            ).values_list('recipe_id', flat=True))
+        old_amounts = get_amounts(recipe_ids)
+        super().save_model(request, obj, form, change)
+        refresh_recipes(old_amounts)
+
+    def delete_model(self, request, obj):
+        old_amounts = get_amounts([obj.recipe_id])
+        super().delete_model(request, obj)
+        refresh_recipes(old_amounts)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        old_amounts = get_amounts(
+            set(queryset.values_list('recipe_id', flat=True))
+        )
+        super().delete_queryset(request, queryset)
+        refresh_recipes(old_amounts)
 
 
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Tag, TagAdmin)
-admin.site.register(Favorite)
-admin.site.register(Cart)
-admin.site.register(IngredientAmount)
+admin.site.register(Favorite, UserRecipeAdmin)
+admin.site.register(Cart, UserRecipeAdmin)
+admin.site.register(IngredientAmount, IngredientAmountAdmin)
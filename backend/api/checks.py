@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+from django.db.models.signals import post_save
+
+from .models import Cart, Favorite
+from .recipe_cache import get_cache
+from .user_recipes import BULK_CREATE_RECEIVERS
+
+
+@register(Tags.caches)
+def check_recipe_cache(app_configs, **kwargs):
+    """Кэш представлений рецептов должен быть общим, если воркеров несколько.
+
+    Иначе правка рецепта удаляет запись только в одном воркере, а
+    остальные отдают старое представление до истечения TIMEOUT.
+    """
+    if settings.WEB_CONCURRENCY > 1 and isinstance(get_cache(), LocMemCache):
+        return [Error(
+            'Кэш recipes локален для процесса, а воркеров '
+            f'{settings.WEB_CONCURRENCY}.',
+            hint='Укажите общий кэш в RECIPE_CACHE_BACKEND и '
+                 'RECIPE_CACHE_LOCATION (Redis, Memcached).',
+            id='api.E001',
+        )]
+    return []
+
+
+@register()
+def check_bulk_create_receivers(app_configs, **kwargs):
+    """apply_side_effects повторяет все обработчики post_save.
+
+    user_recipes.add_recipes вставляет строки через bulk_create, который
+    сигналов не вызывает.
+    """
+    errors = []
+    for model in (Favorite, Cart):
+        for receiver in post_save._live_receivers(model):
+            name = f'{receiver.__module__}.{receiver.__qualname__}'
+            if name not in BULK_CREATE_RECEIVERS:
+                errors.append(Error(
+                    f'Обработчик post_save {name} модели '
+                    f'{model.__name__} не выполняется при пакетном '
+                    'добавлении.',
+                    hint='Повторите его в user_recipes.apply_side_effects '
+                         'и добавьте в BULK_CREATE_RECEIVERS.',
+                    id='api.E002',
+                ))
+    return errors
@@ -3,3 +3,12 @@ MAX_LEN_COLOR = 7
 MAX_LEN_TEXT = 5000
 MIN_LEN_VALID = 1
 MAX_LEN_VALID = 32000
+INGREDIENT_SEARCH_LIMIT = 50
+THUMBNAIL_SIZE = (480, 360)
+IMAGE_QUALITY = 80
+MAX_TAGS = 63
+ADMIN_ESTIMATED_COUNT_FROM = 10000
+ADMIN_SEARCH_LIMIT = 1000
+MAX_BATCH_RECIPES = 100
+FEED_FANOUT_LIMIT = 10000
+FEED_BATCH_SIZE = 1000
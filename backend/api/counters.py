@@ -0,0 +1,73 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import Follow, User
+from .models import Favorite, Recipe
+
+# Хранимый счетчик: (модель, поле, модель строк, внешний ключ на модель).
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'model_to_subscribe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'author'),
+)
+
+
+def change(model, pks, field, delta):
+    """Атомарно меняет счетчик объектов; ниже нуля не опускается."""
+    queryset = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def rows_changed(instances, delta):
+    """Обновляет счетчики, которые учитывают строки instances.
+
+    Одно обновление на каждое различное число строк у объекта, поэтому
+    пакет строк с разными внешними ключами обычно стоит один запрос.
+    """
+    for model, field, source, foreign_key in COUNTERS:
+        rows = Counter(
+            getattr(instance, f'{foreign_key}_id') for instance in instances
+            if isinstance(instance, source)
+        )
+        pks_by_rows = defaultdict(list)
+        for pk, count in rows.items():
+            pks_by_rows[count].append(pk)
+        for count, pks in pks_by_rows.items():
+            change(model, pks, field, delta * count)
+
+
+def row_changed(instance, delta):
+    rows_changed([instance], delta)
+
+
+def actual_count(source, foreign_key):
+    return Coalesce(Subquery(
+        source.objects.filter(
+            **{foreign_key: OuterRef('pk')}
+        ).order_by().values(foreign_key).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def get_drift(model, field, source, foreign_key):
+    """Объекты, у которых счетчик разошелся с числом строк."""
+    return model.objects.alias(
+        actual=actual_count(source, foreign_key)
+    ).exclude(**{field: F('actual')})
+
+
+def repair(model, field, source, foreign_key):
+    """Пересчитывает разошедшиеся счетчики; возвращает их число."""
+    drifted = list(get_drift(
+        model, field, source, foreign_key
+    ).values_list('pk', flat=True))
+    if drifted:
+        model.objects.filter(pk__in=drifted).update(
+            **{field: actual_count(source, foreign_key)}
+        )
+    return len(drifted)
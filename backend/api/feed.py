@@ -0,0 +1,137 @@
+import itertools
+
+from django.db import transaction
+from django.db.models import F
+
+from users.models import Follow, User
+from . import const
+from .models import FeedItem, Recipe
+from .pagination import KeysetPagination
+
+
+def is_pulled(author_id):
+    """У автора слишком много подписчиков: его рецепты читаются при запросе.
+
+    Такие рецепты не раскладываются по лентам подписчиков, а выбираются
+    из Recipe при чтении ленты (FeedPagination).
+    """
+    return User.objects.filter(
+        pk=author_id, followers_count__gt=const.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def get_pulled_authors(user):
+    return list(Follow.objects.filter(
+        user=user, author__followers_count__gt=const.FEED_FANOUT_LIMIT
+    ).values_list('author_id', flat=True))
+
+
+def insert(items):
+    """Пакетная вставка записей ленты; уже существующие пропускаются."""
+    items = iter(items)
+    with transaction.atomic():
+        while True:
+            batch = list(itertools.islice(items, const.FEED_BATCH_SIZE))
+            if not batch:
+                return
+            FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(recipe):
+    """Новый рецепт в ленты всех подписчиков автора."""
+    if is_pulled(recipe.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=recipe.author_id
+    ).values_list('user_id', flat=True).iterator()
+    insert(
+        FeedItem(user_id=user_id, recipe_id=recipe.pk,
+                 author_id=recipe.author_id, pub_date=recipe.pub_date)
+        for user_id in followers
+    )
+
+
+def get_backfill(author_id):
+    """Все рецепты автора для ленты нового подписчика.
+
+    Лента читается только из FeedItem, поэтому рецепты, не попавшие в
+    нее, подписчик не увидит ни на одной странице.
+    """
+    return Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')
+
+
+def backfill(user_id, author_id):
+    if is_pulled(author_id):
+        return
+    insert(
+        FeedItem(user_id=user_id, recipe_id=recipe_id, author_id=author_id,
+                 pub_date=pub_date)
+        for recipe_id, pub_date in get_backfill(author_id).iterator()
+    )
+
+
+def prune(user_id, author_id):
+    FeedItem.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild():
+    """Заново раскладывает ленты по всем подпискам; возвращает число записей.
+
+    Нужен после пакетной загрузки подписок или рецептов в обход сигналов
+    и после того, как автор перестал быть популярным.
+    """
+    with transaction.atomic():
+        FeedItem.objects.all().delete()
+        authors = User.objects.filter(
+            followers_count__gt=0,
+            followers_count__lte=const.FEED_FANOUT_LIMIT
+        ).values_list('id', flat=True).iterator()
+        for author_id in authors:
+            recipes = list(get_backfill(author_id))
+            followers = Follow.objects.filter(
+                author_id=author_id
+            ).values_list('user_id', flat=True).iterator()
+            insert(
+                FeedItem(user_id=user_id, recipe_id=recipe_id,
+                         author_id=author_id, pub_date=pub_date)
+                for user_id in followers for recipe_id, pub_date in recipes
+            )
+        return FeedItem.objects.count()
+
+
+class FeedPagination(KeysetPagination):
+    """Курсорная пагинация ленты подписок.
+
+    Страница — диапазон индекса feed_user_pub_date_idx ленты пользователя.
+    Рецепты популярных авторов выбираются из Recipe с тем же курсором и
+    сливаются со страницей.
+    """
+    ordering = ('-pub_date', '-recipe_id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.user = request.user
+        return super().paginate_queryset(queryset, request, view)
+
+    def fetch(self, queryset, values, ordering):
+        page = super().fetch(queryset, values, ordering)
+        pulled_authors = get_pulled_authors(self.user)
+        if not pulled_authors:
+            return page
+        recipes = super().fetch(
+            Recipe.objects.filter(author_id__in=pulled_authors).annotate(
+                recipe_id=F('id')
+            ).values('recipe_id', 'author_id', 'pub_date'),
+            values, ordering
+        )
+        seen = {item.recipe_id for item in page}
+        page.extend(
+            FeedItem(user=self.user, **recipe) for recipe in recipes
+            if recipe['recipe_id'] not in seen
+        )
+        page.sort(
+            key=lambda item: (item.pub_date, item.recipe_id),
+            reverse=ordering[0].startswith('-')
+        )
+        return page[:self.page_size + 1]
@@ -0,0 +1,80 @@
+from rest_framework import serializers
+
+PROFILES = {
+    # Карточка рецепта в сетке: без описания, тэгов и ингредиентов.
+    'compact': (
+        'id', 'name', 'image', 'image_variants', 'cooking_time',
+        'author.id', 'author.username', 'author.first_name',
+        'author.last_name', 'is_favorited', 'is_in_shopping_cart',
+    ),
+}
+
+
+def split(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def get_requested_paths(request):
+    """Поля из параметров profile, fields и expand или None для всех полей.
+
+    fields и profile задают набор полей (вложенные — через точку:
+    author.username), expand добавляет к нему вложенные объекты целиком.
+    """
+    params = request.query_params
+    if not any(params.get(name) for name in ('profile', 'fields', 'expand')):
+        return None
+    paths = []
+    profile = params.get('profile')
+    if profile:
+        if profile not in PROFILES:
+            raise serializers.ValidationError(
+                {'profile': f'Неизвестный профиль: {profile}'}
+            )
+        paths.extend(PROFILES[profile])
+    paths.extend(split(params.get('fields', '')))
+    paths.extend(split(params.get('expand', '')))
+    return paths
+
+
+def get_child_fields(field):
+    if isinstance(field, serializers.ListSerializer):
+        field = field.child
+    return getattr(field, 'fields', None)
+
+
+def build_tree(paths, fields):
+    """Дерево полей {имя: поддерево или None (поле целиком)}."""
+    tree, unknown = {}, []
+    for path in paths:
+        node, node_fields = tree, fields
+        names = path.split('.')
+        for depth, name in enumerate(names):
+            if node_fields is None or name not in node_fields:
+                unknown.append(path)
+                break
+            if depth == len(names) - 1:
+                node[name] = None
+            elif node.get(name, {}) is not None:
+                node = node.setdefault(name, {})
+                node_fields = get_child_fields(node_fields[name])
+            else:
+                break
+    if unknown:
+        raise serializers.ValidationError(
+            {'fields': f'Неизвестные поля: {", ".join(unknown)}'}
+        )
+    return tree
+
+
+def prune(data, tree):
+    """Оставляет в представлении только поля из дерева."""
+    if tree is None:
+        return data
+    if isinstance(data, list):
+        return [prune(item, tree) for item in data]
+    if not isinstance(data, dict):
+        return data
+    return {
+        name: prune(data[name], subtree)
+        for name, subtree in tree.items() if name in data
+    }
@@ -1,23 +1,21 @@
-from rest_framework.filters import SearchFilter
 from django_filters.rest_framework import FilterSet, filters
 
 from users.models import User
-from .models import Recipe, Tag
-
-
-class IngredientFilter(SearchFilter):
-    search_param = 'name'
+from . import tag_masks
+from .models import Recipe
+from .search import search_recipes
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug',
+    tags = filters.CharFilter(
+        method='filter_tags'
     )
     author = filters.ModelChoiceFilter(
         queryset=User.objects.all()
     )
+    search = filters.CharFilter(
+        method='filter_search'
+    )
     is_favorited = filters.BooleanFilter(
         method='filter_is_favorited'
     )
@@ -25,14 +23,26 @@ class RecipeFilter(FilterSet):
         method='filter_is_in_shopping_cart'
     )
 
+    def filter_tags(self, queryset, name, value):
+        """Рецепты с любым из тэгов; с tags_match=all — со всеми."""
+        return tag_masks.filter_recipes(
+            queryset,
+            self.data.getlist('tags'),
+            match_all=self.data.get('tags_match') == 'all'
+        )
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию, описанию и ингредиентам."""
+        return search_recipes(queryset, value)
+
     def filter_is_favorited(self, queryset, name, value):
         if value and not self.request.user.is_anonymous:
-            return queryset.filter(favorites__user=self.request.user)
+            return queryset.filter(is_favorited=True)
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         if value and not self.request.user.is_anonymous:
-            return queryset.filter(in_cart__user=self.request.user)
+            return queryset.filter(is_in_shopping_cart=True)
         return queryset
 
     class Meta:
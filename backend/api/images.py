@@ -0,0 +1,119 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models.functions import Now
+from PIL import Image, ImageOps
+
+from . import const, recipe_cache, versions
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'variants'
+
+# Название варианта: (размер или None для исходного, формат, расширение)
+VARIANTS = {
+    'thumbnail': (const.THUMBNAIL_SIZE, 'JPEG', 'jpg'),
+    'thumbnail_webp': (const.THUMBNAIL_SIZE, 'WEBP', 'webp'),
+    'webp': (None, 'WEBP', 'webp'),
+}
+
+_executor = ThreadPoolExecutor(max_workers=1)
+
+
+def variant_name(image_name, variant):
+    """Путь к файлу варианта картинки относительно MEDIA_ROOT."""
+    directory, filename = os.path.split(image_name)
+    stem = os.path.splitext(filename)[0]
+    extension = VARIANTS[variant][2]
+    return f'{directory}/{VARIANTS_DIR}/{stem}_{variant}.{extension}'
+
+
+def get_variants(recipe):
+    """Готовые варианты текущей картинки рецепта: {вариант: путь}."""
+    if not recipe.image:
+        return {}
+    return {
+        variant: path
+        for variant, path in (recipe.image_variants or {}).items()
+        if path == variant_name(recipe.image.name, variant)
+    }
+
+
+def has_all_variants(recipe):
+    return len(get_variants(recipe)) == len(VARIANTS)
+
+
+def render_variant(image, variant):
+    size, image_format, _ = VARIANTS[variant]
+    if size is not None:
+        image = ImageOps.fit(image, size, Image.LANCZOS)
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=const.IMAGE_QUALITY)
+    return buffer.getvalue()
+
+
+def delete_files(names):
+    for name in names:
+        if default_storage.exists(name):
+            default_storage.delete(name)
+
+
+def generate_variants(recipe):
+    """Создает варианты картинки рецепта и сохраняет пути к ним.
+
+    Варианты прежней картинки рецепта удаляются.
+    """
+    image_name = recipe.image.name
+    previous = set((recipe.image_variants or {}).values())
+    with recipe.image.open('rb') as image_file:
+        image = Image.open(image_file)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    variants = {}
+    for variant in VARIANTS:
+        name = variant_name(image_name, variant)
+        delete_files([name])
+        variants[variant] = default_storage.save(
+            name, ContentFile(render_variant(image, variant))
+        )
+    updated = Recipe.objects.filter(
+        pk=recipe.pk, image=image_name
+    ).update(image_variants=variants, updated_at=Now())
+    if updated:
+        # update() не вызывает сигналы.
+        recipe_cache.invalidate(recipe.pk)
+        versions.bump(versions.RECIPES)
+        delete_files(previous - set(variants.values()))
+    return variants
+
+
+def _generate_in_background(recipe_id):
+    try:
+        recipe = Recipe.objects.filter(pk=recipe_id).first()
+        if recipe is not None and recipe.image:
+            generate_variants(recipe)
+    except Exception:
+        logger.exception(
+            'Не удалось создать варианты картинки рецепта %s', recipe_id
+        )
+    finally:
+        connection.close()
+
+
+def schedule_variants(recipe):
+    """Ставит создание вариантов в фоновый поток после коммита."""
+    if not recipe.image:
+        return
+    if has_all_variants(recipe):
+        return
+    transaction.on_commit(
+        lambda: _executor.submit(_generate_in_background, recipe.pk)
+    )
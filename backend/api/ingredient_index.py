@@ -0,0 +1,63 @@
+import bisect
+import threading
+
+from . import versions
+from .models import Ingredient
+
+
+class IngredientIndex:
+    """Отсортированный индекс названий ингредиентов в памяти процесса.
+
+    Строится при первом обращении и перестраивается, когда меняется
+    версия ресурса ingredients. Версия хранится в базе и увеличивается при
+    сохранении и удалении ингредиента, поэтому индекс обновляется во всех
+    воркерах.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = (None, [], [])
+
+    def _build(self):
+        rows = sorted(
+            (name.casefold(), pk, name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+        return [row[0] for row in rows], [row[1:] for row in rows]
+
+    def _get_index(self):
+        version = versions.get_version(versions.INGREDIENTS)
+        index = self._index
+        if index[0] != version:
+            with self._lock:
+                index = self._index
+                if index[0] != version:
+                    index = (version, *self._build())
+                    self._index = index
+        return index
+
+    def search(self, prefix, limit):
+        """Ингредиенты, название которых начинается с prefix.
+
+        Регистр не учитывается; точное совпадение идет первым, остальные
+        результаты отсортированы по названию.
+        """
+        _, keys, items = self._get_index()
+        prefix = prefix.casefold()
+        result = []
+        position = bisect.bisect_left(keys, prefix)
+        while (position < len(keys) and len(result) < limit
+               and keys[position].startswith(prefix)):
+            pk, name, measurement_unit = items[position]
+            result.append({
+                'id': pk,
+                'name': name,
+                'measurement_unit': measurement_unit,
+            })
+            position += 1
+        return result
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,253 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import recipe_cache, versions
+
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+class JSONArrayReader:
+    """Элементы JSON-массива верхнего уровня по одному.
+
+    Файл читается кусками, в памяти держится только текущий элемент.
+    """
+    decoder = json.JSONDecoder()
+
+    def __init__(self, file, chunk_size=JSON_CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer, self.position, self.eof = '', 0, False
+
+    def fail(self, message):
+        raise CommandError(f'Неверный JSON: {message}')
+
+    def read_more(self):
+        chunk = self.file.read(self.chunk_size)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+
+    def next_char(self):
+        """Первый значащий символ с текущей позиции ('' в конце файла)."""
+        while True:
+            rest = self.buffer[self.position:]
+            self.position += len(rest) - len(rest.lstrip())
+            if self.position < len(self.buffer) or self.eof:
+                return self.buffer[self.position:self.position + 1]
+            self.read_more()
+
+    def decode_item(self):
+        while True:
+            try:
+                item, end = self.decoder.raw_decode(
+                    self.buffer, self.position
+                )
+            except json.JSONDecodeError as error:
+                if self.eof:
+                    self.fail(str(error))
+            else:
+                # Число в конце куска может продолжаться в следующем.
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return item
+            self.read_more()
+
+    def __iter__(self):
+        if self.next_char() != '[':
+            self.fail('ожидался массив')
+        self.position += 1
+        if self.next_char() == ']':
+            return
+        while True:
+            yield self.decode_item()
+            self.buffer = self.buffer[self.position:]
+            self.position = 0
+            separator = self.next_char()
+            self.position += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                self.fail('ожидалась запятая или конец массива')
+            self.next_char()
+
+
+class CatalogImportCommand(BaseCommand):
+    """Общая часть импорта справочников из csv и json.
+
+    Строки читаются потоком и записываются пачками bulk_create в одной
+    транзакции. Записи, уже существующие по естественному ключу, не
+    дублируются; изменившиеся поля обновляются bulk_update.
+    """
+    model = None
+    fields = ()
+    key_fields = ()
+    default_path = None
+    diff_limit = 20
+
+    def add_arguments(self, parser):
+        path_options = {}
+        if self.default_path is not None:
+            path_options = {'nargs': '?', 'default': self.default_path}
+        parser.add_argument(
+            'path',
+            help='Файл для импорта (.csv или .json)',
+            **path_options
+        )
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'json'),
+            help='Формат файла; по умолчанию определяется по расширению'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк в одной пачке'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Показать изменения, не записывая их в базу'
+        )
+
+    def skip(self, number, message):
+        self.skipped += 1
+        self.stderr.write(f'Запись {number} пропущена: {message}')
+
+    def read_csv(self, file):
+        for number, row in enumerate(csv.reader(file), 1):
+            if not row:
+                continue
+            if len(row) < len(self.fields):
+                self.skip(
+                    number, f'нужны поля {", ".join(self.fields)}: {row}'
+                )
+                continue
+            yield dict(zip(self.fields, (value.strip() for value in row)))
+
+    def read_json(self, file):
+        for number, item in enumerate(JSONArrayReader(file), 1):
+            if not isinstance(item, dict) or any(
+                    item.get(field) is None for field in self.fields):
+                self.skip(
+                    number, f'нужны поля {", ".join(self.fields)} '
+                    f'со значениями: {item}'
+                )
+                continue
+            yield {field: str(item[field]).strip() for field in self.fields}
+
+    def read(self, path, file_format):
+        reader = self.read_json if file_format == 'json' else self.read_csv
+        with open(path, encoding='utf8') as file:
+            yield from reader(file)
+
+    def get_key(self, values):
+        return tuple(values[field] for field in self.key_fields)
+
+    def batches(self, rows, size):
+        rows = iter(rows)
+        batch = list(islice(rows, size))
+        while batch:
+            yield batch
+            batch = list(islice(rows, size))
+
+    def on_changed(self):
+        """Сброс кэшей после изменения справочника."""
+        versions.bump(versions.CATALOG)
+        recipe_cache.clear()
+
+    def get_format(self, path, file_format):
+        if not path.exists():
+            raise CommandError(f'Файл {path} не найден')
+        file_format = file_format or path.suffix.lstrip('.').lower()
+        if file_format not in ('csv', 'json'):
+            raise CommandError(f'Неизвестный формат файла: {path.suffix}')
+        return file_format
+
+    def split_batch(self, batch, existing, seen):
+        """Делит пачку на новые, изменившиеся и пропущенные записи."""
+        new_objects, changed_objects, diff = [], [], []
+        for values in batch:
+            key = self.get_key(values)
+            if key in seen:
+                continue
+            seen.add(key)
+            current = existing.get(key)
+            if current is None:
+                new_objects.append(self.model(**values))
+                diff.append(f'+ {values}')
+            elif any(current[field] != values[field]
+                     for field in self.fields):
+                changed_objects.append(self.model(id=current['id'], **values))
+                diff.append(f'~ {values}')
+        return new_objects, changed_objects, diff
+
+    def write_batch(self, new_objects, changed_objects):
+        self.model.objects.bulk_create(new_objects, ignore_conflicts=True)
+        if changed_objects:
+            self.model.objects.bulk_update(changed_objects, self.fields)
+
+    def write_diff(self, diff):
+        for line in diff[:self.diff_limit]:
+            self.stdout.write(line)
+        if len(diff) > self.diff_limit:
+            self.stdout.write(f'... и еще {len(diff) - self.diff_limit}')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = self.get_format(path, options['format'])
+        dry_run = options['dry_run']
+        started = time.monotonic()
+        rows = list(self.model.objects.values('id', *self.fields))
+        existing = {self.get_key(values): values for values in rows}
+        seen = set()
+        self.skipped = 0
+        created = updated = processed = 0
+        diff = []
+        with transaction.atomic():
+            for batch in self.batches(self.read(path, file_format),
+                                      options['batch_size']):
+                new_objects, changed_objects, batch_diff = self.split_batch(
+                    batch, existing, seen
+                )
+                if not dry_run:
+                    self.write_batch(new_objects, changed_objects)
+                processed += len(batch)
+                created += len(new_objects)
+                updated += len(changed_objects)
+                diff.extend(batch_diff)
+                self.stdout.write(
+                    f'Обработано строк: {processed} '
+                    f'({time.monotonic() - started:.2f} с)'
+                )
+            if not dry_run and created:
+                # bulk_create(ignore_conflicts=True) молча пропускает
+                # строки, нарушающие другие ограничения уникальности.
+                conflicts = max(
+                    created - (self.model.objects.count() - len(rows)), 0
+                )
+                if conflicts:
+                    self.skipped += conflicts
+                    created -= conflicts
+                    processed -= conflicts
+                    self.stderr.write(
+                        f'Не вставлено из-за конфликтов с существующими '
+                        f'записями: {conflicts}'
+                    )
+        if dry_run:
+            self.write_diff(diff)
+        elif created or updated:
+            self.on_changed()
+        result = 'Проверка завершена' if dry_run else 'Импорт завершен'
+        self.stdout.write(
+            f'{result}: новых {created}, изменено {updated}, '
+            f'без изменений {processed - created - updated}, '
+            f'пропущено {self.skipped}, '
+            f'время {time.monotonic() - started:.2f} с'
+        )
@@ -0,0 +1,213 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test.utils import setup_test_environment
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import query_budget
+from api.models import Favorite, Recipe, Tag
+from users.models import Follow, User
+
+
+def percentile(values, percent):
+    """Процентиль по ближайшему рангу для отсортированного списка."""
+    index = max(0, -(-len(values) * percent // 100) - 1)
+    return values[int(index)]
+
+
+def iter_patterns(patterns, prefix=''):
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from iter_patterns(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern):
+            yield route, pattern
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер всех GET-эндпоинтов /api/ внутри процесса: задержки '
+        'p50/p95/p99, пропускная способность и число SQL-запросов в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Число замеряемых запросов на эндпоинт'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=5,
+            help='Число запросов прогрева на эндпоинт'
+        )
+        parser.add_argument(
+            '--user',
+            help='Логин пользователя; по умолчанию — с наибольшим '
+                 'числом подписок'
+        )
+        parser.add_argument(
+            '--anonymous',
+            action='store_true',
+            help='Запросы без авторизации'
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            default=[],
+            help='Дополнительный путь запроса; можно указать несколько раз'
+        )
+        parser.add_argument(
+            '--label',
+            help='Метка прогона, например хэш коммита'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для отчета; по умолчанию stdout'
+        )
+
+    def get_user(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f'Пользователь {username} не найден')
+            return user
+        follower = Follow.objects.values('user').annotate(
+            follows=Count('id')
+        ).order_by('-follows', 'user').first()
+        if follower is not None:
+            return User.objects.get(pk=follower['user'])
+        return User.objects.order_by('id').first()
+
+    def sample_kwargs(self, pattern):
+        """Значения параметров маршрута: первый объект модели вида."""
+        view_class = pattern.callback.cls
+        kwargs = {}
+        for name in pattern.pattern.regex.groupindex:
+            obj = view_class.queryset.model.objects.order_by('pk').first()
+            if obj is None:
+                return None
+            kwargs[name] = obj.pk
+        return kwargs
+
+    def get_routes(self):
+        """Все GET-маршруты DRF под /api/ без суффиксов формата."""
+        routes, seen = [], set()
+        for route, pattern in iter_patterns(get_resolver().url_patterns):
+            actions = getattr(pattern.callback, 'actions', None) or {}
+            if (not route.startswith('api/') or 'get' not in actions
+                    or 'format' in pattern.pattern.regex.groupindex):
+                continue
+            kwargs = self.sample_kwargs(pattern)
+            if kwargs is None:
+                continue
+            path = reverse(pattern.name, kwargs=kwargs)
+            if path not in seen:
+                seen.add(path)
+                routes.append((pattern.name, path))
+        return routes
+
+    def get_filter_routes(self):
+        tag = Tag.objects.order_by('id').first()
+        recipe = Recipe.objects.order_by('id').first()
+        routes = [
+            ('recipes-list is_favorited', '/api/recipes/?is_favorited=1'),
+            ('recipes-list is_in_shopping_cart',
+             '/api/recipes/?is_in_shopping_cart=1'),
+            ('recipes-list cursor', '/api/recipes/?cursor='),
+            ('recipes-list compact', '/api/recipes/?profile=compact'),
+            ('ingredients-list name', '/api/ingredients/?name=%D0%BA'),
+        ]
+        if tag is not None:
+            routes.append((
+                'recipes-list tags', f'/api/recipes/?tags={tag.slug}'
+            ))
+        if recipe is not None:
+            routes.append((
+                'recipes-list author',
+                f'/api/recipes/?author={recipe.author_id}'
+            ))
+            routes.append((
+                'recipes-list search',
+                f'/api/recipes/?search={recipe.name.split()[0]}'
+            ))
+        return routes
+
+    def request(self, client, path):
+        with query_budget.track() as recorder:
+            started = time.perf_counter()
+            response = client.get(path)
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, recorder.count
+
+    def measure(self, client, name, path, options):
+        for _ in range(options['warmup']):
+            self.request(client, path)
+        timings, queries, statuses = [], [], set()
+        for _ in range(options['requests']):
+            status, elapsed, count = self.request(client, path)
+            statuses.add(status)
+            timings.append(elapsed)
+            queries.append(count)
+        timings.sort()
+        return {
+            'name': name,
+            'path': path,
+            'status': sorted(statuses),
+            'p50_ms': round(percentile(timings, 50) * 1000, 2),
+            'p95_ms': round(percentile(timings, 95) * 1000, 2),
+            'p99_ms': round(percentile(timings, 99) * 1000, 2),
+            'rps': round(len(timings) / sum(timings), 1),
+            'queries': max(queries),
+        }
+
+    def get_client(self, options):
+        client = APIClient()
+        if options['anonymous']:
+            return client, None
+        user = self.get_user(options['user'])
+        if user is None:
+            raise CommandError('В базе нет пользователей')
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client, user
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должно быть больше нуля')
+        setup_test_environment()
+        client, user = self.get_client(options)
+        routes = self.get_routes() + self.get_filter_routes()
+        routes += [(path, path) for path in options['paths']]
+        report = {
+            'label': options['label'],
+            'timestamp': timezone.now().isoformat(),
+            'user': user.username if user else None,
+            'requests': options['requests'],
+            'data': {
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+                'follows': Follow.objects.count(),
+                'favorites': Favorite.objects.count(),
+            },
+            'routes': [
+                self.measure(client, name, path, options)
+                for name, path in routes
+            ],
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,106 @@
+import gzip
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.middleware import brotli
+from api.renderers import FastJSONRenderer, orjson
+
+from .benchmark_api import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение JSONRenderer и FastJSONRenderer на списках рецептов и '
+        'ингредиентов: время сериализации и размер ответа с gzip и brotli'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='Число замеров на каждый способ'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=100,
+            help='Размер страницы списка рецептов'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для отчета; по умолчанию stdout'
+        )
+
+    def timed(self, func, data, repeat):
+        """Медиана времени в миллисекундах и результат последнего вызова."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func(data)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        return round(percentile(timings, 50) * 1000, 3), result
+
+    def get_payloads(self, limit):
+        client = APIClient()
+        payloads = {}
+        for name, path in (
+            ('recipes', f'/api/recipes/?limit={limit}'),
+            ('ingredients', '/api/ingredients/'),
+        ):
+            response = client.get(path)
+            if response.status_code != 200:
+                raise CommandError(f'{path}: ответ {response.status_code}')
+            payloads[name] = response.data
+        return payloads
+
+    def measure(self, data, repeat):
+        renderers = {'json': JSONRenderer(), 'orjson': FastJSONRenderer()}
+        result = {}
+        for name, renderer in renderers.items():
+            if name == 'orjson' and orjson is None:
+                continue
+            result[f'{name}_ms'], content = self.timed(
+                renderer.render, data, repeat
+            )
+        result['bytes'] = len(content)
+        codecs = {'gzip': lambda body: gzip.compress(body, 6)}
+        if brotli is not None:
+            codecs['br'] = lambda body: brotli.compress(
+                body, quality=settings.COMPRESSION_BROTLI_QUALITY
+            )
+        for name, compress in codecs.items():
+            result[f'{name}_ms'], compressed = self.timed(
+                compress, content, repeat
+            )
+            result[f'{name}_bytes'] = len(compressed)
+            result[f'{name}_ratio'] = round(len(compressed) / len(content), 3)
+        return result
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должно быть больше нуля')
+        setup_test_environment()
+        payloads = self.get_payloads(options['limit'])
+        report = {
+            'orjson': orjson is not None,
+            'brotli': brotli is not None,
+            'repeat': options['repeat'],
+            'payloads': {
+                name: self.measure(data, options['repeat'])
+                for name, data in payloads.items()
+            },
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
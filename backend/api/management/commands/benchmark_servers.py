@@ -0,0 +1,118 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?limit=6&page=2',
+    '/api/tags/',
+    '/api/ingredients/?name=%D0%B0',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочное сравнение развёртываний (например, WSGI и ASGI) '
+        'на эндпоинтах чтения при разной конкурентности'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets',
+            nargs='+',
+            help='Серверы в виде имя=адрес, например wsgi=http://host:8000'
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Путь запроса; можно указать несколько раз'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            nargs='+',
+            default=[1, 10, 50],
+            help='Число одновременных клиентов'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Число запросов на каждый прогон'
+        )
+        parser.add_argument(
+            '--token',
+            help='Токен пользователя для авторизованных запросов'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=30,
+            help='Таймаут одного запроса, секунд'
+        )
+
+    def parse_targets(self, targets):
+        parsed = []
+        for target in targets:
+            name, sep, url = target.partition('=')
+            if not sep or not url:
+                raise CommandError(f'Ожидается имя=адрес: {target}')
+            parsed.append((name, url.rstrip('/')))
+        return parsed
+
+    def fetch(self, url, headers, timeout):
+        started = time.perf_counter()
+        try:
+            with urlopen(Request(url, headers=headers),
+                         timeout=timeout) as response:
+                response.read()
+                ok = response.status < 400
+        except (HTTPError, URLError, OSError, ValueError):
+            ok = False
+        return time.perf_counter() - started, ok
+
+    def run(self, base_url, paths, concurrency, total, headers, timeout):
+        urls = [base_url + paths[i % len(paths)] for i in range(total)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(
+                lambda url: self.fetch(url, headers, timeout), urls
+            ))
+        elapsed = time.perf_counter() - started
+        latencies = sorted(latency for latency, ok in results if ok)
+        errors = sum(1 for _, ok in results if not ok)
+        if not latencies:
+            return total / elapsed, None, None, errors
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return (
+            total / elapsed, statistics.median(latencies) * 1000,
+            p95 * 1000, errors
+        )
+
+    def handle(self, *args, **options):
+        targets = self.parse_targets(options['targets'])
+        paths = options['paths'] or list(DEFAULT_PATHS)
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        self.stdout.write(
+            f'{"сервер":<12}{"клиентов":>10}{"запр/с":>10}'
+            f'{"p50, мс":>10}{"p95, мс":>10}{"ошибок":>8}'
+        )
+        for concurrency in options['concurrency']:
+            for name, base_url in targets:
+                rps, p50, p95, errors = self.run(
+                    base_url, paths, concurrency, options['requests'],
+                    headers, options['timeout']
+                )
+                p50 = '-' if p50 is None else f'{p50:.1f}'
+                p95 = '-' if p95 is None else f'{p95:.1f}'
+                self.stdout.write(
+                    f'{name:<12}{concurrency:>10}{rps:>10.1f}'
+                    f'{p50:>10}{p95:>10}{errors:>8}'
+                )
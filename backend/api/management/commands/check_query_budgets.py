@@ -0,0 +1,210 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.core.exceptions import SynchronousOnlyOperation
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import AsyncClient, override_settings
+from django.test.utils import setup_test_environment
+from django.urls import resolve
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import query_budget
+from api.pagination import KeysetPagination, OptionalCursorPagination
+from api.models import (Cart, Favorite, Ingredient, IngredientAmount, Recipe,
+                        Tag)
+from users.models import Follow, User
+
+AUTHORS = 3
+RECIPES_PER_AUTHOR = 8
+INGREDIENTS_PER_RECIPE = 4
+# Списки, число запросов которых не должно зависеть от размера страницы.
+PAGE_SIZE_CASES = ('/api/recipes/', '/api/recipes/?cursor=')
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверка бюджетов SQL-запросов (query_budgets представлений) '
+        'на тестовых данных: ошибка, если эндпоинт их превышает'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--show-queries',
+            action='store_true',
+            help='Выводить повторяющиеся запросы'
+        )
+
+    def seed(self):
+        """Данные, на которых видны N+1: несколько авторов и рецептов."""
+        user = User.objects.create_user(
+            username='budget_user', email='budget_user@example.com',
+            first_name='budget', last_name='user', password='budget_password'
+        )
+        tags = [
+            Tag.objects.create(
+                name=f'budget{i}', slug=f'budget{i}', color='#000000'
+            )
+            for i in range(3)
+        ]
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'budget{i}', measurement_unit='g')
+            for i in range(INGREDIENTS_PER_RECIPE * 2)
+        )
+        ingredients = list(Ingredient.objects.filter(
+            name__startswith='budget'
+        ))
+        for number in range(AUTHORS):
+            author = User.objects.create_user(
+                username=f'budget_author{number}',
+                email=f'budget_author{number}@example.com',
+                first_name='budget', last_name='author',
+                password='budget_password'
+            )
+            Follow.objects.create(user=user, author=author)
+            for index in range(RECIPES_PER_AUTHOR):
+                recipe = Recipe.objects.create(
+                    author=author, name=f'budget {number} {index}',
+                    text='budget', cooking_time=1
+                )
+                recipe.tags.set(tags[:index % len(tags) + 1])
+                IngredientAmount.objects.bulk_create(
+                    IngredientAmount(
+                        recipe=recipe, ingredient=ingredient, amount=1
+                    )
+                    for ingredient in ingredients[
+                        index % 2:index % 2 + INGREDIENTS_PER_RECIPE]
+                )
+                if index % 2:
+                    Favorite.objects.create(
+                        user=user, model_to_subscribe=recipe
+                    )
+                    Cart.objects.create(user=user, model_to_subscribe=recipe)
+        return user, author, recipe, tags[0], ingredients[0]
+
+    def get_cases(self, author, recipe, tag, ingredient):
+        return [
+            '/api/recipes/',
+            '/api/recipes/?is_favorited=1',
+            '/api/recipes/?profile=compact',
+            '/api/recipes/feed/',
+            f'/api/recipes/?tags={tag.slug}',
+            f'/api/recipes/{recipe.id}/',
+            '/api/tags/',
+            f'/api/tags/{tag.id}/',
+            '/api/ingredients/',
+            '/api/ingredients/?name=budget',
+            f'/api/ingredients/{ingredient.id}/',
+            '/api/users/',
+            f'/api/users/{author.id}/',
+            '/api/users/me/',
+            '/api/users/subscriptions/',
+        ]
+
+    def measure(self, client, path):
+        caches['recipes'].clear()
+        with query_budget.track() as recorder:
+            response = client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f'{path}: ответ {response.status_code}')
+        return recorder
+
+    def check_page_size(self, client):
+        """Одна и та же цена страницы из одного рецепта и из всех (N+1)."""
+        failures = []
+        for path in PAGE_SIZE_CASES:
+            counts = []
+            for page_size in (1, AUTHORS * RECIPES_PER_AUTHOR):
+                with mock.patch.object(OptionalCursorPagination,
+                                       'page_size', page_size), \
+                        mock.patch.object(KeysetPagination,
+                                          'page_size', page_size):
+                    counts.append(self.measure(client, path).count)
+            self.stdout.write(f'{path}: по размеру страницы {counts}')
+            if len(set(counts)) > 1:
+                failures.append(
+                    f'{path}: число запросов растет с размером страницы '
+                    f'{counts}'
+                )
+        return failures
+
+    def check_asgi(self, token):
+        """Цепочка middleware и потоковые ответы под ASGI.
+
+        ASGIHandler читает тело StreamingHttpResponse в цикле событий,
+        где запросы к базе запрещены.
+        """
+        failures = []
+        # Асинхронные представления ходят в базу из своих потоков и не
+        # видят данных незавершенной транзакции, поэтому тэги — анонимно.
+        # Именованные аргументы AsyncClient — заголовки ASGI.
+        cases = (
+            ('/api/tags/', {}),
+            ('/api/recipes/download_shopping_cart/',
+             {'authorization': f'Token {token}'}),
+        )
+
+        async def get(path, headers):
+            response = await AsyncClient().get(path, **headers)
+            # Как в ASGIHandler.send_response: тело читается в цикле событий.
+            for _ in response:
+                pass
+            return response
+
+        for path, headers in cases:
+            with override_settings(QUERY_BUDGET_ENABLED=True,
+                                   ROOT_URLCONF='foodgram.asgi_urls'):
+                try:
+                    response = async_to_sync(get)(path, headers)
+                except SynchronousOnlyOperation as error:
+                    failures.append(f'ASGI {path}: {error}')
+                    continue
+            if response.status_code != 200:
+                failures.append(f'ASGI {path}: ответ {response.status_code}')
+            elif not response.has_header('X-DB-Queries'):
+                failures.append(f'ASGI {path}: нет заголовка X-DB-Queries')
+            else:
+                self.stdout.write(
+                    f'ASGI {path}: {response["X-DB-Queries"]}'
+                )
+        return failures
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        query_budget.enable()
+        with transaction.atomic():
+            user, author, recipe, tag, ingredient = self.seed()
+            token = Token.objects.create(user=user)
+            failures = self.check_asgi(token)
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+            # Токен уже в кэше auth, как у постоянно работающего клиента.
+            client.get('/api/users/me/')
+            failures.extend(self.check_page_size(client))
+            for path in self.get_cases(author, recipe, tag, ingredient):
+                match = resolve(path.split('?')[0])
+                name, budget = query_budget.get_view_budget(
+                    match.func, 'GET'
+                )
+                recorder = self.measure(client, path)
+                self.stdout.write(
+                    f'{path}: {name} {recorder.count}/{budget}'
+                )
+                if options['show_queries']:
+                    for sql, count in recorder.duplicates.items():
+                        self.stdout.write(f'  x{count} {sql}')
+                if budget is None:
+                    failures.append(f'{name}: бюджет не объявлен')
+                elif recorder.count > budget:
+                    failures.append(
+                        f'{path}: {recorder.count} запросов '
+                        f'при бюджете {budget}'
+                    )
+            transaction.set_rollback(True)
+        for failure in failures:
+            self.stderr.write(failure)
+        if failures:
+            raise CommandError(f'Превышений бюджета: {len(failures)}')
+        self.stdout.write('Бюджеты запросов соблюдены')
@@ -0,0 +1,140 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.utils.http import urlencode
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.feed import FeedPagination
+from api.filters import RecipeFilter
+from api.models import (Cart, Favorite, FeedItem, Ingredient,
+                        IngredientAmount, Recipe, Tag)
+from api.views import RecipeViewSet
+from users.models import Follow, User
+
+SEQ_SCAN_PATTERNS = {
+    'postgresql': r'Seq Scan on {table}\b',
+    'sqlite': r'SCAN (TABLE )?{table}\b(?! USING (COVERING )?INDEX)',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверка планов выполнения основных запросов API: '
+        'ошибка, если запрос читает горячую таблицу полным просмотром'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Выводить план каждого запроса'
+        )
+
+    def seed(self):
+        """Минимальный набор данных, если база пуста."""
+        user = User.objects.create_user(
+            username='plan_user', email='plan_user@example.com',
+            first_name='plan', last_name='user', password='plan_password'
+        )
+        author = User.objects.create_user(
+            username='plan_author', email='plan_author@example.com',
+            first_name='plan', last_name='author', password='plan_password'
+        )
+        tag = Tag.objects.create(name='plan', slug='plan', color='#000000')
+        ingredient = Ingredient.objects.create(
+            name='plan', measurement_unit='g'
+        )
+        recipe = Recipe.objects.create(
+            author=author, name='plan', text='plan', cooking_time=1
+        )
+        recipe.tags.add(tag)
+        IngredientAmount.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=1
+        )
+        Follow.objects.create(user=user, author=author)
+        Favorite.objects.create(user=user, model_to_subscribe=recipe)
+        Cart.objects.create(user=user, model_to_subscribe=recipe)
+
+    def get_queries(self):
+        follow = Follow.objects.select_related('user', 'author').first()
+        user, author = follow.user, follow.author
+        tag = Tag.objects.first()
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        view = RecipeViewSet(request=request, format_kwarg=None,
+                             action='list')
+        recipes = view.get_queryset()
+        recipe = recipes.first()
+
+        def recipe_filter(params):
+            return RecipeFilter(
+                QueryDict(urlencode(params, doseq=True)),
+                queryset=recipes, request=request
+            ).qs
+
+        return [
+            ('RecipeViewSet.list', recipes[:6],
+             ['api_recipe', 'api_favorite', 'api_cart']),
+            ('RecipeViewSet.retrieve', recipes.filter(pk=recipe.pk),
+             ['api_recipe', 'api_favorite', 'api_cart']),
+            ('recipe tags prefetch',
+             Tag.objects.filter(recipe__in=[recipe.pk]),
+             ['api_recipe_tags']),
+            ('recipe ingredients prefetch',
+             IngredientAmount.objects.filter(recipe__in=[recipe.pk]),
+             ['api_ingredientamount']),
+            ('RecipeFilter.author', recipe_filter({'author': author.pk})[:6],
+             ['api_recipe']),
+            ('RecipeFilter.tags', recipe_filter({'tags': [tag.slug]})[:6],
+             ['api_recipe']),
+            ('RecipeFilter.search',
+             recipe_filter({'search': recipe.name})[:6],
+             ['api_recipe']),
+            ('RecipeFilter.is_favorited',
+             recipe_filter({'is_favorited': 'true'})[:6],
+             ['api_favorite']),
+            ('RecipeFilter.is_in_shopping_cart',
+             recipe_filter({'is_in_shopping_cart': 'true'})[:6],
+             ['api_cart']),
+            ('UserViewSet.subscriptions',
+             Follow.objects.filter(user=user).select_related('author'),
+             ['users_follow']),
+            ('FollowSerializer.get_recipes',
+             Recipe.objects.filter(author=author)[:3],
+             ['api_recipe']),
+            ('RecipeViewSet.feed',
+             FeedItem.objects.filter(user=user).order_by(
+                 *FeedPagination.ordering
+             )[:7],
+             ['api_feeditem']),
+        ]
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(
+                f'СУБД {connection.vendor} не поддерживается'
+            )
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            if not Follow.objects.exists():
+                self.seed()
+            for name, queryset, tables in self.get_queries():
+                plan = queryset.explain()
+                if options['verbose_plans']:
+                    self.stdout.write(f'{name}:\n{plan}\n')
+                for table in tables:
+                    if re.search(pattern.format(table=table), plan):
+                        failures.append(f'{name}: полный просмотр {table}')
+            transaction.set_rollback(True)
+        for failure in failures:
+            self.stderr.write(failure)
+        if failures:
+            raise CommandError(f'Планов с полным просмотром: {len(failures)}')
+        self.stdout.write('Планы запросов в порядке')
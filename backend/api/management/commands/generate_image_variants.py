@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from api import images
+from api.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создание уменьшенных и WebP вариантов картинок рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать варианты, даже если они уже есть'
+        )
+
+    def handle(self, *args, **options):
+        created = failed = 0
+        recipes = Recipe.objects.exclude(image='').exclude(image__isnull=True)
+        for recipe in recipes.iterator():
+            if not options['force'] and images.has_all_variants(recipe):
+                continue
+            try:
+                images.generate_variants(recipe)
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f'{recipe.image.name}: {error}')
+                continue
+            created += 1
+        self.stdout.write(
+            f'Обработано картинок: {created}, с ошибками: {failed}'
+        )
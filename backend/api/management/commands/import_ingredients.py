@@ -1,21 +1,15 @@
-import csv
-
-from django.core.management.base import BaseCommand
-
+from api import versions
 from api.models import Ingredient
+from ._catalog import CatalogImportCommand
 
 
-class Command(BaseCommand):
-    help = 'Импорт ингредиентов из csv файла'
+class Command(CatalogImportCommand):
+    help = 'Импорт ингредиентов из csv или json файла'
+    model = Ingredient
+    fields = ('name', 'measurement_unit')
+    key_fields = ('name', 'measurement_unit')
+    default_path = 'data/ingredients.csv'
 
-    def handle(self, *args, **options):
-        with open(r'data/ingredients.csv',
-                  encoding='utf8') as csvfile:
-            reader = csv.reader(csvfile)
-            for row in reader:
-                i = Ingredient(
-                    name=row[0],
-                    measurement_unit=row[1]
-                )
-                i.save()
-            print('Импорт ингредиентов завершен')
+    def on_changed(self):
+        versions.bump(versions.INGREDIENTS)
+        super().on_changed()
@@ -0,0 +1,18 @@
+from api import versions
+from api.models import Tag
+from ._catalog import CatalogImportCommand
+
+
+class Command(CatalogImportCommand):
+    help = 'Импорт тэгов из csv (name,color,slug) или json файла'
+    model = Tag
+    fields = ('name', 'color', 'slug')
+    key_fields = ('slug',)
+
+    def write_batch(self, new_objects, changed_objects):
+        Tag.assign_bits(new_objects)
+        super().write_batch(new_objects, changed_objects)
+
+    def on_changed(self):
+        versions.bump(versions.TAGS)
+        super().on_changed()
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api import feed
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересборка лент подписок: последние рецепты каждого автора '
+        'раскладываются по лентам его подписчиков'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Записей в лентах: {feed.rebuild()}')
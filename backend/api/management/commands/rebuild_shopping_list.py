@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from api.models import IngredientAmount, ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = 'Пересчет списков покупок по содержимому корзин'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сравнить таблицу с корзинами, ничего не меняя'
+        )
+
+    def expected(self):
+        return {
+            (row['recipe__in_cart__user'], row['ingredient']):
+                row['total_amount']
+            for row in IngredientAmount.objects.filter(
+                recipe__in_cart__isnull=False
+            ).values(
+                'recipe__in_cart__user', 'ingredient'
+            ).annotate(total_amount=Sum('amount')).order_by()
+        }
+
+    def handle(self, *args, **options):
+        expected = self.expected()
+        if options['check']:
+            actual = {
+                (user_id, ingredient_id): total_amount
+                for user_id, ingredient_id, total_amount
+                in ShoppingListItem.objects.values_list(
+                    'user_id', 'ingredient_id', 'total_amount'
+                )
+            }
+            diff = [
+                key for key in expected.keys() | actual.keys()
+                if expected.get(key) != actual.get(key)
+            ]
+            for user_id, ingredient_id in sorted(diff):
+                self.stdout.write(
+                    f'user={user_id} ingredient={ingredient_id}: '
+                    f'ожидалось {expected.get((user_id, ingredient_id))}, '
+                    f'в таблице {actual.get((user_id, ingredient_id))}'
+                )
+            if diff:
+                raise CommandError(f'Расхождений: {len(diff)}')
+            self.stdout.write('Списки покупок совпадают с корзинами')
+            return
+        with transaction.atomic():
+            ShoppingListItem.objects.all().delete()
+            ShoppingListItem.objects.bulk_create(
+                (ShoppingListItem(user_id=user_id,
+                                  ingredient_id=ingredient_id,
+                                  total_amount=total_amount)
+                 for (user_id, ingredient_id), total_amount
+                 in expected.items()),
+                batch_size=1000
+            )
+        self.stdout.write(f'Списки покупок пересчитаны: {len(expected)}')
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверка хранимых счетчиков (избранное, рецепты, подписчики) '
+        'с данными и исправление расхождений'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только найти расхождения, ничего не меняя'
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        with transaction.atomic():
+            for model, field, source, foreign_key in counters.COUNTERS:
+                name = f'{model.__name__}.{field}'
+                if options['check']:
+                    drifted = counters.get_drift(
+                        model, field, source, foreign_key
+                    ).count()
+                else:
+                    drifted = counters.repair(
+                        model, field, source, foreign_key
+                    )
+                total += drifted
+                self.stdout.write(f'{name}: расхождений {drifted}')
+        if not options['check']:
+            self.stdout.write(f'Счетчики пересчитаны: {total}')
+        elif total:
+            raise CommandError(f'Расхождений: {total}')
+        else:
+            self.stdout.write('Счетчики совпадают с данными')
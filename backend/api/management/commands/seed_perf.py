@@ -0,0 +1,238 @@
+import itertools
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api import const, recipe_cache, search, tag_masks, versions
+from api.models import (Cart, Favorite, Ingredient, IngredientAmount, Recipe,
+                        Tag)
+from users.models import Follow, User
+
+PREFIX = 'perf_user_'
+PASSWORD = 'perf_password'
+TAGS = (
+    ('Завтрак', 'breakfast', '#E26C2D'),
+    ('Обед', 'lunch', '#49B64E'),
+    ('Ужин', 'dinner', '#8775D2'),
+    ('Десерт', 'dessert', '#F5A3B5'),
+    ('Выпечка', 'bakery', '#C28E5C'),
+    ('Суп', 'soup', '#D9534F'),
+    ('Салат', 'salad', '#7CB342'),
+    ('Вегетарианское', 'vegetarian', '#2E7D32'),
+)
+DISHES = ('Суп', 'Салат', 'Рагу', 'Запеканка', 'Пирог', 'Паста', 'Омлет',
+          'Каша', 'Плов', 'Котлеты', 'Рулет', 'Десерт')
+AMOUNTS = (1, 2, 3, 5, 10, 50, 100, 150, 200, 250, 300, 500)
+
+
+def zipf_weights(size, exponent=1.1):
+    """Накопленные веса: первые элементы популярнее остальных."""
+    return list(itertools.accumulate(
+        1 / (rank + 1) ** exponent for rank in range(size)
+    ))
+
+
+class Command(BaseCommand):
+    help = (
+        'Детерминированная генерация данных для нагрузочных тестов: '
+        'пользователи, рецепты, подписки, избранное и корзины'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Одинаковый seed дает одинаковые данные'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Удалить ранее сгенерированные данные перед генерацией'
+        )
+
+    def sample(self, population, cum_weights, count):
+        """До count различных элементов с учетом популярности."""
+        chosen = {}
+        for _ in range(count * 3):
+            if len(chosen) >= count:
+                break
+            item = self.rng.choices(population, cum_weights=cum_weights)[0]
+            chosen[item] = None
+        return list(chosen)
+
+    def get_tags(self):
+        for name, slug, color in TAGS:
+            if not Tag.objects.filter(slug=slug).exists():
+                Tag.objects.create(name=name, slug=slug, color=color)
+        return list(Tag.objects.order_by('id'))
+
+    def get_ingredients(self):
+        if not Ingredient.objects.exists():
+            call_command('import_ingredients', stdout=self.stdout)
+        ingredients = list(Ingredient.objects.order_by('id'))
+        if not ingredients:
+            raise CommandError('Справочник ингредиентов пуст')
+        self.rng.shuffle(ingredients)
+        return ingredients
+
+    def create_users(self, count):
+        password = make_password(PASSWORD)
+        User.objects.bulk_create(
+            (User(username=f'{PREFIX}{number}',
+                  email=f'{PREFIX}{number}@example.com',
+                  first_name=f'Имя{number}', last_name=f'Фамилия{number}',
+                  password=password)
+             for number in range(count)),
+            batch_size=self.batch_size
+        )
+        return list(User.objects.filter(
+            username__startswith=PREFIX
+        ).order_by('id'))
+
+    def build_recipe(self, number, author, ingredients, tags):
+        main = ingredients[0].name
+        return Recipe(
+            author=author,
+            name=f'{self.rng.choice(DISHES)} ({main}) №{number}'[
+                :const.MAX_LEN_CHAR],
+            text=' '.join(
+                f'Добавьте {ingredient.name}.' for ingredient in ingredients
+            ),
+            cooking_time=max(1, min(600, int(
+                self.rng.lognormvariate(3.3, 0.6)
+            ))),
+            tag_mask=tag_masks.get_mask(tag.bit for tag in tags)
+        )
+
+    def create_recipes(self, count, users, tags, ingredients):
+        authors = users[:max(1, len(users) // 5)]
+        author_weights = zipf_weights(len(authors))
+        ingredient_weights = zipf_weights(len(ingredients))
+        tag_weights = zipf_weights(len(tags), exponent=0.7)
+        recipes, compositions = [], []
+        for number in range(count):
+            recipe_ingredients = self.sample(
+                ingredients, ingredient_weights, self.rng.randint(3, 12)
+            )
+            recipe_tags = self.sample(
+                tags, tag_weights, self.rng.randint(1, 3)
+            )
+            author = self.rng.choices(authors, cum_weights=author_weights)[0]
+            recipes.append(self.build_recipe(
+                number, author, recipe_ingredients, recipe_tags
+            ))
+            compositions.append((recipe_ingredients, recipe_tags))
+        Recipe.objects.bulk_create(recipes, batch_size=self.batch_size)
+        recipe_ids = list(Recipe.objects.filter(
+            author__username__startswith=PREFIX
+        ).order_by('id').values_list('id', flat=True))
+        self.create_compositions(recipe_ids, compositions)
+        return recipe_ids, authors
+
+    def create_compositions(self, recipe_ids, compositions):
+        amounts, recipe_tags = [], []
+        for recipe_id, (ingredients, tags) in zip(recipe_ids, compositions):
+            amounts.extend(
+                IngredientAmount(
+                    recipe_id=recipe_id, ingredient_id=ingredient.pk,
+                    amount=self.rng.choice(AMOUNTS)
+                )
+                for ingredient in ingredients
+            )
+            recipe_tags.extend(
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag.pk)
+                for tag in tags
+            )
+        IngredientAmount.objects.bulk_create(
+            amounts, batch_size=self.batch_size
+        )
+        Recipe.tags.through.objects.bulk_create(
+            recipe_tags, batch_size=self.batch_size
+        )
+
+    def create_links(self, model, field, users, ids, counts,
+                     exclude_self=False):
+        """Связи пользователей с авторами или рецептами.
+
+        Популярность целей распределена по Ципфу, число связей у
+        пользователя — по Парето; поле _order заполняется вручную,
+        так как bulk_create его не вычисляет.
+        """
+        cum_weights = zipf_weights(len(ids))
+        order = {}
+        links = []
+        for user in users:
+            for target_id in self.sample(ids, cum_weights, next(counts)):
+                if exclude_self and target_id == user.pk:
+                    continue
+                order[target_id] = order.get(target_id, -1) + 1
+                links.append(model(**{
+                    'user_id': user.pk, f'{field}_id': target_id,
+                    '_order': order[target_id]
+                }))
+        model.objects.bulk_create(links, batch_size=self.batch_size)
+        return len(links)
+
+    def pareto_counts(self, alpha, limit):
+        while True:
+            yield min(limit, int(self.rng.paretovariate(alpha)) - 1)
+
+    def update_derived(self, recipe_ids):
+        """Производные данные, которые bulk_create не обновляет сигналами."""
+        for start in range(0, len(recipe_ids), self.batch_size):
+            search.update_index(recipe_ids[start:start + self.batch_size])
+        call_command('rebuild_shopping_list', stdout=self.stdout)
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('rebuild_feed', stdout=self.stdout)
+        versions.bump(versions.RECIPES, versions.CATALOG)
+        recipe_cache.clear()
+
+    def clear(self):
+        deleted, _ = User.objects.filter(
+            username__startswith=PREFIX
+        ).delete()
+        self.stdout.write(f'Удалено объектов: {deleted}')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.monotonic()
+        with transaction.atomic():
+            if options['clear']:
+                self.clear()
+            if User.objects.filter(username__startswith=PREFIX).exists():
+                raise CommandError(
+                    'Данные уже сгенерированы, используйте --clear'
+                )
+            tags = self.get_tags()
+            ingredients = self.get_ingredients()
+            users = self.create_users(options['users'])
+            recipe_ids, authors = self.create_recipes(
+                options['recipes'], users, tags, ingredients
+            )
+            follows = self.create_links(
+                Follow, 'author', users, [author.pk for author in authors],
+                self.pareto_counts(1.5, 100), exclude_self=True
+            )
+            favorites = self.create_links(
+                Favorite, 'model_to_subscribe', users, recipe_ids,
+                self.pareto_counts(1.2, 200)
+            )
+            carts = self.create_links(
+                Cart, 'model_to_subscribe', users, recipe_ids,
+                self.pareto_counts(2.0, 10)
+            )
+            self.update_derived(recipe_ids)
+        self.stdout.write(
+            f'Пользователей: {len(users)}, рецептов: {len(recipe_ids)}, '
+            f'подписок: {follows}, в избранном: {favorites}, '
+            f'в корзинах: {carts}, время {time.monotonic() - started:.1f} с'
+        )
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+from . import query_budget
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/javascript', 'application/xml',
+    'image/svg+xml',
+)
+
+
+def parse_accept_encoding(header):
+    """Кодировки из Accept-Encoding с весами q: {кодировка: q}."""
+    weights = {}
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+    return weights
+
+
+def choose_encoding(header, supported):
+    """Кодировка с наибольшим весом; при равных — первая из supported."""
+    weights = parse_accept_encoding(header)
+    best, best_weight = None, 0.0
+    for encoding in supported:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class HybridMiddleware:
+    """Middleware для WSGI и ASGI.
+
+    При асинхронной цепочке экземпляр помечается как корутинная функция,
+    как это делает MiddlewareMixin: иначе внешний middleware вызовет его
+    синхронно и получит корутину вместо ответа.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+
+class QueryBudgetMiddleware(HybridMiddleware):
+    """Учёт SQL-запросов каждого запроса к API.
+
+    Добавляет заголовки Server-Timing и X-DB-Queries и пишет в лог
+    превышения бюджетов, объявленных в query_budgets представлений.
+    Включается настройкой QUERY_BUDGET_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        # Соединения потоков, где синхронные представления выполняются
+        # под ASGI, могут открыться раньше первого запроса.
+        query_budget.enable()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with query_budget.track() as recorder:
+            response = self.get_response(request)
+        return self.process(request, response, recorder)
+
+    async def __acall__(self, request):
+        with query_budget.track() as recorder:
+            response = await self.get_response(request)
+        return self.process(request, response, recorder)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = query_budget.get_view_budget(
+            view_func, request.method
+        )
+
+    def process(self, request, response, recorder):
+        duration = recorder.duration * 1000
+        response['X-DB-Queries'] = str(recorder.count)
+        response['X-DB-Duplicate-Queries'] = str(recorder.duplicate_count)
+        response['Server-Timing'] = (
+            f'db;dur={duration:.1f};desc="{recorder.count} queries"'
+        )
+        name, budget = getattr(request, 'query_budget', (None, None))
+        if budget is not None and recorder.count > budget:
+            duplicates = sorted(
+                recorder.duplicates.items(), key=lambda item: -item[1]
+            )[:3]
+            logger.warning(
+                '%s: %s SQL-запросов при бюджете %s (%s %s), '
+                'повторы: %s',
+                name, recorder.count, budget, request.method,
+                request.get_full_path(), duplicates
+            )
+        return response
+
+
+class CompressionMiddleware(HybridMiddleware):
+    """Сжатие ответов brotli или gzip по заголовку Accept-Encoding.
+
+    Сжимаются текстовые ответы от COMPRESSION_MIN_SIZE байт; brotli — при
+    установленном пакете brotli. Потоковые ответы сжимаются только gzip.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+        self.encodings = ('br', 'gzip') if brotli else ('gzip',)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.process(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process(request, await self.get_response(request))
+
+    def is_compressible(self, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0]
+        if not (content_type.startswith('text/')
+                or content_type in COMPRESSIBLE_TYPES):
+            return False
+        return response.streaming or len(response.content) >= self.min_size
+
+    def process(self, request, response):
+        if not self.is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''),
+            ('gzip',) if response.streaming else self.encodings
+        )
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compress_sequence(
+                response.streaming_content
+            )
+            del response['Content-Length']
+        else:
+            if encoding == 'br':
+                content = brotli.compress(
+                    response.content,
+                    quality=settings.COMPRESSION_BROTLI_QUALITY
+                )
+            else:
+                content = compress_string(response.content)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        # Сжатый ответ не совпадает побайтно с несжатым.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
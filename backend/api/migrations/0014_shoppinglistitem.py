@@ -0,0 +1,50 @@
+# Generated by Django 3.2.19 on 2026-10-18 02:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_shopping_list(apps, schema_editor):
+    IngredientAmount = apps.get_model('api', 'IngredientAmount')
+    ShoppingListItem = apps.get_model('api', 'ShoppingListItem')
+    ShoppingListItem.objects.bulk_create(
+        (ShoppingListItem(user_id=row['recipe__in_cart__user'],
+                          ingredient_id=row['ingredient'],
+                          total_amount=row['total_amount'])
+         for row in IngredientAmount.objects.filter(
+             recipe__in_cart__isnull=False
+        ).values('recipe__in_cart__user', 'ingredient').annotate(
+             total_amount=models.Sum('amount')
+        ).order_by()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0013_alter_favorite_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.IntegerField(default=0, verbose_name='Общее количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Позиция списка покупок',
+                'verbose_name_plural': 'Список покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_item'),
+        ),
+        migrations.RunPython(fill_shopping_list, migrations.RunPython.noop),
+    ]
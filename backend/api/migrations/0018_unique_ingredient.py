@@ -0,0 +1,59 @@
+# Generated by Django 3.2.19 on 2026-10-18 02:49
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Оставляет по одному ингредиенту на пару (название, единицы)."""
+    Ingredient = apps.get_model('api', 'Ingredient')
+    IngredientAmount = apps.get_model('api', 'IngredientAmount')
+    ShoppingListItem = apps.get_model('api', 'ShoppingListItem')
+    canonical = {}
+    duplicates = {}
+    for pk, name, unit in Ingredient.objects.order_by('id').values_list(
+        'id', 'name', 'measurement_unit'
+    ):
+        if (name, unit) in canonical:
+            duplicates[pk] = canonical[(name, unit)]
+        else:
+            canonical[(name, unit)] = pk
+    for duplicate_id, ingredient_id in duplicates.items():
+        IngredientAmount.objects.filter(
+            ingredient_id=duplicate_id,
+            recipe__in=IngredientAmount.objects.filter(
+                ingredient_id=ingredient_id
+            ).values('recipe')
+        ).delete()
+        IngredientAmount.objects.filter(
+            ingredient_id=duplicate_id
+        ).update(ingredient_id=ingredient_id)
+        for item in ShoppingListItem.objects.filter(
+            ingredient_id=duplicate_id
+        ):
+            updated = ShoppingListItem.objects.filter(
+                user_id=item.user_id, ingredient_id=ingredient_id
+            ).update(total_amount=F('total_amount') + item.total_amount)
+            if updated:
+                item.delete()
+            else:
+                item.ingredient_id = ingredient_id
+                item.save()
+    Ingredient.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_conditional_get'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
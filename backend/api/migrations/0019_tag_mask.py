@@ -0,0 +1,46 @@
+# Generated by Django 3.2.19 on 2026-10-18 02:52
+
+from django.db import migrations, models
+
+
+def fill_tag_masks(apps, schema_editor):
+    Tag = apps.get_model('api', 'Tag')
+    Recipe = apps.get_model('api', 'Recipe')
+    bits = {}
+    for bit, tag in enumerate(Tag.objects.order_by('id')):
+        tag.bit = bit
+        tag.save(update_fields=['bit'])
+        bits[tag.id] = bit
+    masks = {}
+    for recipe_id, tag_id in Recipe.tags.through.objects.values_list(
+        'recipe_id', 'tag_id'
+    ):
+        masks[recipe_id] = masks.get(recipe_id, 0) | 1 << bits[tag_id]
+    for recipe_id, mask in masks.items():
+        Recipe.objects.filter(pk=recipe_id).update(tag_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_mask',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Маска тэгов'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, verbose_name='Номер бита в маске тэгов рецепта'),
+        ),
+        migrations.RunPython(fill_tag_masks, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tag',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, unique=True, verbose_name='Номер бита в маске тэгов рецепта'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 3.2.19 on 2026-10-18 02:54
+
+from django.db import migrations
+
+# Схема и первичное заполнение индекса зафиксированы здесь, а не берутся
+# из api.search: правки модуля не должны менять старую миграцию.
+INSTALL_SQL = {
+    'postgresql': (
+        'ALTER TABLE api_recipe ADD COLUMN search_vector tsvector',
+        'CREATE INDEX recipe_search_vector_idx ON api_recipe '
+        'USING GIN (search_vector)',
+        "UPDATE api_recipe r SET search_vector = "
+        "setweight(to_tsvector('russian', r.name), 'A') || "
+        "setweight(to_tsvector('russian', coalesce("
+        "(SELECT string_agg(i.name, ' ') FROM api_ingredientamount ia "
+        "JOIN api_ingredient i ON i.id = ia.ingredient_id "
+        "WHERE ia.recipe_id = r.id), '')), 'B') || "
+        "setweight(to_tsvector('russian', r.text), 'C')",
+    ),
+    'sqlite': (
+        'CREATE VIRTUAL TABLE api_recipe_search USING fts5('
+        'name, text, ingredients, tokenize="unicode61")',
+        "INSERT INTO api_recipe_search (rowid, name, text, ingredients) "
+        "SELECT r.id, r.name, r.text, coalesce("
+        "(SELECT group_concat(i.name, ' ') FROM api_ingredientamount ia "
+        "JOIN api_ingredient i ON i.id = ia.ingredient_id "
+        "WHERE ia.recipe_id = r.id), '') FROM api_recipe r",
+    ),
+}
+
+UNINSTALL_SQL = {
+    'postgresql': (
+        'ALTER TABLE api_recipe DROP COLUMN search_vector',
+    ),
+    'sqlite': (
+        'DROP TABLE api_recipe_search',
+    ),
+}
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_tag_mask'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(INSTALL_SQL), run_for_vendor(UNINSTALL_SQL)
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.19 on 2026-10-18 03:01
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('api', 'Recipe')
+    Favorite = apps.get_model('api', 'Favorite')
+    User = apps.get_model('users', 'User')
+    Follow = apps.get_model('users', 'Follow')
+    for model, field, source, foreign_key in (
+        (Recipe, 'favorites_count', Favorite, 'model_to_subscribe'),
+        (User, 'recipes_count', Recipe, 'author'),
+        (User, 'followers_count', Follow, 'author'),
+    ):
+        model.objects.update(**{field: Coalesce(Subquery(
+            source.objects.filter(
+                **{foreign_key: OuterRef('pk')}
+            ).order_by().values(foreign_key).annotate(
+                total=Count('pk')
+            ).values('total')
+        ), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_counters'),
+        ('api', '0020_recipe_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 3.2.19 on 2026-10-18 03:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+FANOUT_LIMIT = 10000
+
+
+def fill_feed(apps, schema_editor):
+    Recipe = apps.get_model('api', 'Recipe')
+    FeedItem = apps.get_model('api', 'FeedItem')
+    User = apps.get_model('users', 'User')
+    Follow = apps.get_model('users', 'Follow')
+    authors = User.objects.filter(
+        followers_count__gt=0, followers_count__lte=FANOUT_LIMIT
+    ).values_list('id', flat=True)
+    for author_id in authors.iterator():
+        recipes = list(Recipe.objects.filter(author_id=author_id).order_by(
+            '-pub_date', '-id'
+        ).values_list('id', 'pub_date'))
+        followers = Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True)
+        FeedItem.objects.bulk_create(
+            (FeedItem(user_id=user_id, recipe_id=recipe_id,
+                      author_id=author_id, pub_date=pub_date)
+             for user_id in followers for recipe_id, pub_date in recipes),
+            batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0007_counters'),
+        ('api', '0021_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор рецепта')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Лента подписок',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_user_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['user', 'author'], name='feed_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feeditem',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_item'),
+        ),
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from . import versions
+
+
+class ConditionalGetMixin:
+    """Ответ 304 на If-None-Match / If-Modified-Since без сериализации.
+
+    Валидаторы строятся из версий ресурсов, от которых зависит ответ
+    (get_version_names), и дополнительных значений (get_etag_extra).
+    """
+    vary_on_user = False
+
+    def get_version_names(self, request, detail):
+        return []
+
+    def get_etag_extra(self, request, detail):
+        return [request.get_full_path(), request.accepted_renderer.format]
+
+    def get_object_last_modified(self, request):
+        """Дата изменения запрошенного объекта, если она известна."""
+        return None
+
+    def get_validators(self, request, detail):
+        names = self.get_version_names(request, detail)
+        current = versions.get_versions(names)
+        parts = [f'{name}={current[name][0]}' for name in names]
+        parts.extend(str(part) for part in self.get_etag_extra(
+            request, detail
+        ))
+        dates = [updated_at for _, updated_at in current.values()
+                 if updated_at is not None]
+        if detail:
+            object_last_modified = self.get_object_last_modified(request)
+            if object_last_modified is not None:
+                parts.append(object_last_modified.isoformat())
+                dates.append(object_last_modified)
+        etag = quote_etag(
+            hashlib.md5('|'.join(parts).encode()).hexdigest()
+        )
+        last_modified = int(max(dates).timestamp()) if dates else None
+        return etag, last_modified
+
+    def conditional_response(self, request, handler, detail,
+                             *args, **kwargs):
+        etag, last_modified = self.get_validators(request, detail)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code not in (200, 304):
+            return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        if self.vary_on_user:
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, super().list, False, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, super().retrieve, True, *args, **kwargs
+        )
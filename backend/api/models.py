@@ -1,3 +1,4 @@
+from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
@@ -21,6 +22,11 @@ class Tag(models.Model):
         max_length=const.MAX_LEN_CHAR,
         unique=True
     )
+    bit = models.PositiveSmallIntegerField(
+        'Номер бита в маске тэгов рецепта',
+        unique=True,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Тэг'
@@ -30,6 +36,24 @@ class Tag(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def assign_bits(cls, tags):
+        """Назначает свободные номера битов тэгам без номера."""
+        used = set(cls.objects.values_list('bit', flat=True))
+        free = (bit for bit in range(const.MAX_TAGS) if bit not in used)
+        for tag in tags:
+            if tag.bit is None:
+                tag.bit = next(free, None)
+            if tag.bit is None:
+                raise ValidationError(
+                    f'Нельзя создать больше {const.MAX_TAGS} тэгов.'
+                )
+
+    def save(self, *args, **kwargs):
+        if self.bit is None:
+            Tag.assign_bits([self])
+        super().save(*args, **kwargs)
+
 
 class Ingredient(models.Model):
     """Модель ингредиента"""
@@ -46,6 +70,12 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -75,6 +105,12 @@ class Recipe(models.Model):
         null=True,
         default=None
     )
+    image_variants = models.JSONField(
+        'Варианты картинки',
+        default=dict,
+        blank=True,
+        editable=False
+    )
     text = models.TextField(
         'Описание',
         max_length=const.MAX_LEN_TEXT
@@ -92,11 +128,34 @@ class Recipe(models.Model):
         auto_now_add=True,
         blank=True
     )
+    tag_mask = models.BigIntegerField(
+        'Маска тэгов',
+        default=0,
+        editable=False
+    )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='recipe_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -195,3 +254,102 @@ class IngredientAmount(models.Model):
 
     def __str__(self):
         return f'Количество {self.ingredient.name} - {self.amount}'
+
+
+class ShoppingListItem(models.Model):
+    """Список покупок пользователя, поддерживаемый при изменении корзины"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='shopping_list'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.IntegerField(
+        'Общее количество',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Список покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'], name='unique_shopping_list_item'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.ingredient.name} - {self.total_amount}'
+
+
+class FeedItem(models.Model):
+    """Рецепт в ленте подписок пользователя, добавленный при публикации"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='feed'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='+'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор рецепта',
+        related_name='+'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'], name='unique_feed_item'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='feed_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'], name='feed_user_author_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.recipe_id}'
+
+
+class ResourceVersion(models.Model):
+    """Номер версии ресурса API для условных запросов"""
+    name = models.CharField(
+        'Ресурс',
+        max_length=const.MAX_LEN_CHAR,
+        unique=True
+    )
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=0
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
+
+    class Meta:
+        verbose_name = 'Версия ресурса'
+        verbose_name_plural = 'Версии ресурсов'
+
+    def __str__(self):
+        return f'{self.name} - {self.version}'
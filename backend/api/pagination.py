@@ -1,5 +1,185 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import const
 
 
 class CustomPagination(PageNumberPagination):
     page_size = 6
+
+
+class KeysetPagination(BasePagination):
+    """Курсорная пагинация по набору полей сортировки.
+
+    Следующая страница выбирается условием по значениям ключа последней
+    записи, а не через OFFSET, и без COUNT(*). Поэтому любая страница
+    стоит одинаково, а новые записи не сдвигают уже выданные.
+    """
+    page_size = 6
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+    ordering = ('-pub_date', '-id')
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = ordering
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values, reverse = cursor['v'], bool(cursor.get('r'))
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def encode_cursor(self, instance, reverse):
+        values = [
+            self.fields[name].value_to_string(instance)
+            for name in self.field_names
+        ]
+        cursor = json.dumps({'v': values, 'r': reverse})
+        encoded = base64.urlsafe_b64encode(cursor.encode()).decode()
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_filter(self, values, ordering):
+        condition = None
+        equal = {}
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            value = self.fields[name].to_python(value)
+            term = Q(**equal, **{f'{name}__{lookup}': value})
+            condition = term if condition is None else condition | term
+            equal[name] = value
+        return condition
+
+    def fetch(self, queryset, values, ordering):
+        """Записи после курсора values и еще одна — признак следующей."""
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.get_filter(values, ordering))
+        return list(queryset[:self.page_size + 1])
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.field_names = [field.lstrip('-') for field in self.ordering]
+        self.fields = {
+            name: queryset.model._meta.get_field(name)
+            for name in self.field_names
+        }
+        values, reverse = self.decode_cursor(request)
+        ordering = self.ordering
+        if reverse:
+            ordering = [
+                name if field.startswith('-') else f'-{name}'
+                for field, name in zip(self.ordering, self.field_names)
+            ]
+        page = self.fetch(queryset, values, ordering)
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if reverse:
+            page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+        self.page = page
+        return page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class OptionalCursorPagination(CustomPagination):
+    """Постраничная пагинация с курсорным режимом по запросу.
+
+    По умолчанию работает как CustomPagination. Если в запросе есть
+    параметр cursor (для первой страницы — пустой), используется
+    KeysetPagination с сортировкой cursor_ordering; она должна совпадать
+    с сортировкой постраничного режима. Параметры из
+    cursor_excluded_params меняют сортировку (search — по релевантности)
+    и с курсором не сочетаются.
+    """
+    cursor_ordering = ('-pub_date', '-id')
+    cursor_excluded_params = ('search',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if KeysetPagination.cursor_query_param in request.query_params:
+            excluded = [
+                name for name in self.cursor_excluded_params
+                if request.query_params.get(name)
+            ]
+            if excluded:
+                raise ValidationError({
+                    KeysetPagination.cursor_query_param:
+                    'Курсорная пагинация не сочетается с параметрами: '
+                    f'{", ".join(excluded)}.'
+                })
+            self.keyset = KeysetPagination(self.cursor_ordering)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class SubscriptionPagination(OptionalCursorPagination):
+    cursor_ordering = ('id',)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор админки, не считающий строки больших таблиц.
+
+    Для списка без фильтров на PostgreSQL число строк берется из
+    статистики планировщика, если таблица больше порога: точный COUNT(*)
+    по сотням тысяч строк занимает секунды.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if (query is not None and not query.where
+                and connection.vendor == 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [query.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= const.ADMIN_ESTIMATED_COUNT_FROM:
+                return int(row[0])
+        return super().count
@@ -0,0 +1,99 @@
+import contextvars
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_recorder = contextvars.ContextVar('query_recorder', default=None)
+
+IN_LIST_RE = re.compile(r'\((?:%s, )+%s\)')
+
+
+def fingerprint(sql):
+    """Текст запроса без различий в длине списков IN (...)."""
+    return IN_LIST_RE.sub('(...)', sql)
+
+
+class QueryRecorder:
+    """Число запросов, суммарное время и повторы одинаковых запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    @property
+    def duplicates(self):
+        return {sql: count for sql, count in self.fingerprints.items()
+                if count > 1}
+
+    @property
+    def duplicate_count(self):
+        return sum(count - 1 for count in self.duplicates.values())
+
+    def add(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+        self.fingerprints[fingerprint(sql)] += 1
+
+
+def record_query(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.add(sql, time.perf_counter() - started)
+
+
+def install(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def _install_on_connect(sender, connection, **kwargs):
+    install(connection)
+
+
+def enable():
+    """Подключает учёт ко всем соединениям, включая будущие.
+
+    Запросы учитываются только внутри track(), поэтому вне его
+    обёртка ничего не делает.
+    """
+    connection_created.connect(
+        _install_on_connect, dispatch_uid='query_budget'
+    )
+    for connection in connections.all():
+        install(connection)
+
+
+@contextmanager
+def track():
+    """Собирает запросы текущего контекста, в том числе из пула ORM."""
+    enable()
+    recorder = QueryRecorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+def get_view_budget(view_func, method):
+    """Имя действия вида «RecipeViewSet.list» и его бюджет запросов.
+
+    Бюджеты объявляются в атрибуте query_budgets класса представления.
+    """
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return None, None
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower(), method.lower())
+    budgets = getattr(view_class, 'query_budgets', {})
+    return f'{view_class.__name__}.{action}', budgets.get(action)
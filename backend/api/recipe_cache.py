@@ -0,0 +1,50 @@
+from django.core.cache import caches
+from django.db import transaction
+
+CACHE_ALIAS = 'recipes'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def cache_key(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def get_many(recipes, base_url):
+    """Закэшированные представления рецептов: {id: данные}.
+
+    Представление содержит абсолютные ссылки на картинки, поэтому записи,
+    сохраненные для другого адреса сайта, считаются отсутствующими.
+    Так же отбрасываются записи для другого updated_at рецепта: их мог
+    записать запрос, прочитавший рецепт до правки, уже после удаления
+    записи по коммиту.
+    """
+    recipes = {cache_key(recipe.id): recipe for recipe in recipes}
+    return {
+        recipes[key].id: data
+        for key, (cached_url, updated_at, data)
+        in get_cache().get_many(recipes).items()
+        if cached_url == base_url and updated_at == recipes[key].updated_at
+    }
+
+
+def set_many(recipes, representations, base_url):
+    get_cache().set_many({
+        cache_key(recipe.id): (
+            base_url, recipe.updated_at, representations[recipe.id]
+        )
+        for recipe in recipes
+    })
+
+
+def invalidate(*recipe_ids):
+    """Удаляет представления рецептов после коммита транзакции."""
+    keys = [cache_key(recipe_id) for recipe_id in recipe_ids]
+    if keys:
+        transaction.on_commit(lambda: get_cache().delete_many(keys))
+
+
+def clear():
+    transaction.on_commit(get_cache().clear)
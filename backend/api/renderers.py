@@ -0,0 +1,45 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON через orjson, если он установлен.
+
+    Ответы с отступами (BrowsableAPI, indent=) и настройки UNICODE_JSON=False
+    или COMPACT_JSON=False отдаются стандартным json. NaN и Infinity orjson
+    пишет как null, поэтому ответ остается строгим JSON.
+    """
+    options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+               if orjson else 0)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type,
+                                   renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        ret = orjson.dumps(
+            data, default=encoders.JSONEncoder().default, option=self.options
+        )
+        # Как и JSONRenderer, экранирует U+2028 и U+2029 для JavaScript.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
+
+
+class PlainTextRenderer(FastJSONRenderer):
+    """Формат txt для выгрузки; сообщения об ошибках отдаются как JSON."""
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(FastJSONRenderer):
+    """Формат csv для выгрузки; сообщения об ошибках отдаются как JSON."""
+    media_type = 'text/csv'
+    format = 'csv'
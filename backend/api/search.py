@@ -0,0 +1,155 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+SQLITE_TABLE = 'api_recipe_search'
+
+INGREDIENT_NAMES_SQL = (
+    '(SELECT {aggregate} FROM api_ingredientamount ia '
+    'JOIN api_ingredient i ON i.id = ia.ingredient_id '
+    'WHERE ia.recipe_id = r.id)'
+)
+
+
+class PostgresSearch:
+    """tsvector-колонка api_recipe.search_vector с GIN-индексом.
+
+    Колонку и индекс создает миграция 0020_recipe_search.
+
+    Название весит больше ингредиентов, ингредиенты — больше описания.
+    """
+    update_sql = (
+        "UPDATE api_recipe r SET search_vector = "
+        "setweight(to_tsvector('{config}', r.name), 'A') || "
+        "setweight(to_tsvector('{config}', coalesce({ingredients}, '')), "
+        "'B') || "
+        "setweight(to_tsvector('{config}', r.text), 'C')"
+    ).format(
+        config=SEARCH_CONFIG,
+        ingredients=INGREDIENT_NAMES_SQL.format(
+            aggregate="string_agg(i.name, ' ')"
+        )
+    )
+    query_sql = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+
+    def update(self, cursor, recipe_ids=None):
+        if recipe_ids is None:
+            cursor.execute(self.update_sql)
+        else:
+            cursor.execute(
+                f'{self.update_sql} WHERE r.id = ANY(%s)', [list(recipe_ids)]
+            )
+
+    def delete(self, cursor, recipe_ids):
+        """Строка индекса удаляется вместе с рецептом."""
+
+    def search(self, queryset, query):
+        return queryset.filter(RawSQL(
+            f'api_recipe.search_vector @@ {self.query_sql}', [query],
+            output_field=BooleanField()
+        )).annotate(search_rank=RawSQL(
+            f'ts_rank(api_recipe.search_vector, {self.query_sql})', [query],
+            output_field=FloatField()
+        ))
+
+
+class SQLiteSearch:
+    """Теневая таблица FTS5 (миграция 0020) для разработки и тестов."""
+    insert_sql = (
+        f'INSERT INTO {SQLITE_TABLE} (rowid, name, text, ingredients) '
+        f'SELECT r.id, r.name, r.text, coalesce({{ingredients}}, \'\') '
+        f'FROM api_recipe r'
+    ).format(ingredients=INGREDIENT_NAMES_SQL.format(
+        aggregate="group_concat(i.name, ' ')"
+    ))
+    # Веса столбцов name, text, ingredients для bm25.
+    rank_sql = f'bm25({SQLITE_TABLE}, 10.0, 1.0, 5.0)'
+
+    def update(self, cursor, recipe_ids=None):
+        if recipe_ids is None:
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE}')
+            cursor.execute(self.insert_sql)
+            return
+        recipe_ids = list(recipe_ids)
+        self.delete(cursor, recipe_ids)
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        cursor.execute(
+            f'{self.insert_sql} WHERE r.id IN ({placeholders})', recipe_ids
+        )
+
+    def delete(self, cursor, recipe_ids):
+        recipe_ids = list(recipe_ids)
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        cursor.execute(
+            f'DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({placeholders})',
+            recipe_ids
+        )
+
+    def to_match(self, query):
+        """Запрос FTS5: все слова обязательны, каждое — как префикс."""
+        words = re.findall(r'\w+', query)
+        return ' '.join(f'"{word}"*' for word in words)
+
+    def search(self, queryset, query):
+        match = self.to_match(query)
+        if not match:
+            return queryset.none().annotate(
+                search_rank=Value(0.0, output_field=FloatField())
+            )
+        return queryset.filter(RawSQL(
+            f'api_recipe.id IN (SELECT rowid FROM {SQLITE_TABLE} '
+            f'WHERE {SQLITE_TABLE} MATCH %s)', [match],
+            output_field=BooleanField()
+        )).annotate(search_rank=RawSQL(
+            f'(SELECT -{self.rank_sql} FROM {SQLITE_TABLE} '
+            f'WHERE {SQLITE_TABLE} MATCH %s AND rowid = api_recipe.id)',
+            [match], output_field=FloatField()
+        ))
+
+
+class FallbackSearch:
+    """Поиск по названию для остальных СУБД, без ранжирования."""
+
+    def update(self, cursor, recipe_ids=None):
+        pass
+
+    def delete(self, cursor, recipe_ids):
+        pass
+
+    def search(self, queryset, query):
+        return queryset.filter(name__icontains=query).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+
+BACKENDS = {
+    'postgresql': PostgresSearch,
+    'sqlite': SQLiteSearch,
+}
+
+
+def get_backend(vendor=None):
+    return BACKENDS.get(vendor or connection.vendor, FallbackSearch)()
+
+
+def update_index(recipe_ids=None):
+    """Обновляет поисковый индекс рецептов (всех, если ids не заданы)."""
+    if recipe_ids is not None and not recipe_ids:
+        return
+    with connection.cursor() as cursor:
+        get_backend().update(cursor, recipe_ids)
+
+
+def delete_from_index(recipe_ids):
+    with connection.cursor() as cursor:
+        get_backend().delete(cursor, recipe_ids)
+
+
+def search_recipes(queryset, query):
+    """Рецепты, подходящие под запрос, от более релевантных к менее."""
+    return get_backend().search(queryset, query).order_by(
+        '-search_rank', '-pub_date', '-id'
+    )
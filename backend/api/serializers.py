@@ -1,14 +1,45 @@
 from collections import defaultdict
 
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Window, prefetch_related_objects
+from django.db.models.functions import RowNumber
 from rest_framework import serializers
 from drf_extra_fields.fields import Base64ImageField
 
 from users.models import Follow
-from users.serializers import GetUserSerializer
-from . import const
+from users.serializers import GetUserSerializer, get_followed_authors
+from . import (const, fieldsets, images, recipe_cache, search,
+               shopping_cart)
 from .models import Cart, Ingredient, IngredientAmount, Recipe, Tag
 
 
+class ImageVariantsField(serializers.Field):
+    """Ссылки на варианты картинки рецепта.
+
+    Пока варианты не созданы, для каждого отдается ссылка на оригинал.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        variants = images.get_variants(recipe)
+        request = self.context.get('request')
+        urls = {}
+        for variant in images.VARIANTS:
+            url = (default_storage.url(variants[variant])
+                   if variant in variants else recipe.image.url)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[variant] = url
+        return urls
+
+
 class LimitTagSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -20,7 +51,7 @@ class TagsSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Tag
-        fields = '__all__'
+        fields = ('id', 'name', 'color', 'slug')
 
 
 class IngredientsSerializer(serializers.ModelSerializer):
@@ -64,25 +95,97 @@ class CreateUpdateDeleteRecipesSerializer(serializers.ModelSerializer):
         fields = ('ingredients', 'tags', 'image', 'name',
                   'text', 'cooking_time',)
 
+    def validate_ingredients(self, value):
+        ids = [ingredient['id'] for ingredient in value]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError(
+                'Ингредиенты не должны повторяться.'
+            )
+        missing = set(ids) - Ingredient.objects.in_bulk(ids).keys()
+        if missing:
+            raise serializers.ValidationError(
+                f'Ингредиенты не найдены: {sorted(missing)}'
+            )
+        return value
+
+    def validate(self, attrs):
+        if 'tags' not in self.initial_data:
+            return attrs
+        tags = self.initial_data.get('tags')
+        if not isinstance(tags, list) or not all(
+            isinstance(tag, int) for tag in tags
+        ):
+            raise serializers.ValidationError(
+                {'tags': 'Ожидается список id тэгов.'}
+            )
+        missing = set(tags) - Tag.objects.in_bulk(tags).keys()
+        if missing:
+            raise serializers.ValidationError(
+                {'tags': f'Тэги не найдены: {sorted(missing)}'}
+            )
+        attrs['tags'] = tags
+        return attrs
+
     def create_ingredients(self, ingredients_data, recipe):
         IngredientAmount.objects.bulk_create(
             IngredientAmount(
-                ingredient=Ingredient.objects.get(id=ingredient['id']),
+                ingredient_id=ingredient['id'],
                 amount=ingredient['amount'],
                 recipe=recipe
             )
             for ingredient in ingredients_data
         )
 
+    def update_ingredients(self, ingredients_data, recipe):
+        """Приводит ингредиенты рецепта к новому списку.
+
+        Добавляет новые строки, обновляет изменившиеся количества и удаляет
+        лишние строки вместо пересоздания всего состава.
+        """
+        current = {
+            amount.ingredient_id: amount
+            for amount in IngredientAmount.objects.filter(recipe=recipe)
+        }
+        new_amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients_data
+        }
+        old_amounts = {
+            ingredient_id: ingredient_amount.amount
+            for ingredient_id, ingredient_amount in current.items()
+        }
+        changed = []
+        for ingredient_id, amount in new_amounts.items():
+            ingredient_amount = current.get(ingredient_id)
+            if ingredient_amount is not None and (
+                    ingredient_amount.amount != amount):
+                ingredient_amount.amount = amount
+                changed.append(ingredient_amount)
+        removed = current.keys() - new_amounts.keys()
+        if removed:
+            IngredientAmount.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        if changed:
+            IngredientAmount.objects.bulk_update(changed, ['amount'])
+        self.create_ingredients(
+            [ingredient for ingredient in ingredients_data
+             if ingredient['id'] not in current],
+            recipe
+        )
+        shopping_cart.change_recipe(recipe.id, old_amounts, new_amounts)
+
+    @transaction.atomic
     def create(self, validated_data):
-        image = validated_data.pop('image')
         ingredients_data = validated_data.pop('ingredients')
-        tags_data = self.initial_data.get('tags')
-        recipe = Recipe.objects.create(**validated_data, image=image)
-        recipe.tags.set(tags_data)
+        tags = validated_data.pop('tags', [])
+        recipe = Recipe.objects.create(**validated_data)
+        recipe.tags.set(tags)
         self.create_ingredients(ingredients_data, recipe)
+        search.update_index([recipe.id])
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         instance.name = validated_data.get('name', instance.name)
         instance.image = validated_data.get('image', instance.image)
@@ -91,14 +194,13 @@ class CreateUpdateDeleteRecipesSerializer(serializers.ModelSerializer):
             'cooking_time',
             instance.cooking_time
         )
-        instance.tags.clear()
-        tags_data = self.initial_data.get('tags')
-        instance.tags.set(tags_data)
         instance.save()
-        ingredients_data = validated_data.get('ingredients', [])
-        instance.ingredients.clear()
-        IngredientAmount.objects.filter(recipe=instance).all().delete()
-        self.create_ingredients(ingredients_data, instance)
+        if 'tags' in validated_data:
+            instance.tags.set(validated_data['tags'])
+        if 'ingredients' in validated_data:
+            self.update_ingredients(validated_data['ingredients'], instance)
+            search.update_index([instance.id])
+        recipe_cache.invalidate(instance.id)
         return instance
 
     def to_representation(self, instance):
@@ -108,34 +210,112 @@ class CreateUpdateDeleteRecipesSerializer(serializers.ModelSerializer):
         return ret
 
 
+class RecipeListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        if hasattr(data, 'all'):
+            data = data.all()
+        return self.child.to_representation_many(list(data))
+
+
 class GetRecipesSerializer(serializers.ModelSerializer):
+    """Рецепт для чтения.
+
+    Часть представления, не зависящая от пользователя, берется из кэша
+    recipe_cache; отметки пользователя добавляются при каждом запросе.
+    Набор полей context['fieldset'] (см. fieldsets) сокращает ответ.
+    """
     ingredients = IngredientAmountSerializer(
         many=True,
         source='ingredientamount_set'
     )
     tags = TagsSerializer(read_only=True, many=True)
     image = Base64ImageField(required=False, allow_null=True)
+    image_variants = ImageVariantsField()
     author = GetUserSerializer(read_only=True)
-    is_favorited = serializers.SerializerMethodField()
-    is_in_shopping_cart = serializers.SerializerMethodField()
+    is_favorited = serializers.BooleanField(read_only=True)
+    is_in_shopping_cart = serializers.BooleanField(read_only=True)
+
+    # Связи, которые загружаются отдельными запросами.
+    relation_prefetches = {
+        'tags': 'tags',
+        'ingredients': 'ingredientamount_set__ingredient',
+    }
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'name', 'image', 'text',
-                  'cooking_time')
+                  'is_in_shopping_cart', 'name', 'image', 'image_variants',
+                  'text', 'cooking_time')
+        list_serializer_class = RecipeListSerializer
 
-    def get_is_favorited(self, obj):
-        user = self.context['request'].user
-        return user.fav_user.filter(model_to_subscribe=obj).exists()
+    def to_representation(self, instance):
+        return self.to_representation_many([instance])[0]
 
-    def get_is_in_shopping_cart(self, obj):
-        user = self.context['request'].user
-        return user.cart_user.filter(model_to_subscribe=obj).exists()
+    def to_representation_many(self, recipes):
+        request = self.context.get('request')
+        fieldset = self.context.get('fieldset')
+        base_url = request.build_absolute_uri('/') if request else ''
+        cached = recipe_cache.get_many(recipes, base_url)
+        missing = [recipe for recipe in recipes if recipe.id not in cached]
+        if missing and fieldset is None:
+            prefetch_related_objects(
+                missing, *self.relation_prefetches.values()
+            )
+            fresh = {
+                recipe.id: super(GetRecipesSerializer, self).to_representation(
+                    recipe
+                )
+                for recipe in missing
+            }
+            recipe_cache.set_many(missing, fresh, base_url)
+            cached.update(fresh)
+        elif missing:
+            cached.update(self.to_representation_partial(missing, fieldset))
+        followed = get_followed_authors(request)
+        result = []
+        for recipe in recipes:
+            data = cached[recipe.id].copy()
+            if 'author' in data:
+                data['author'] = data['author'].copy()
+                data['author']['is_subscribed'] = (
+                    recipe.author_id in followed
+                )
+            data['is_favorited'] = getattr(recipe, 'is_favorited', False)
+            data['is_in_shopping_cart'] = getattr(
+                recipe, 'is_in_shopping_cart', False
+            )
+            result.append(fieldsets.prune(data, fieldset))
+        return result
+
+    def to_representation_partial(self, recipes, fieldset):
+        """Только выбранные поля, без записи в кэш.
+
+        Связи, которых нет в наборе полей, не загружаются.
+        """
+        prefetch_related_objects(recipes, *(
+            lookup for name, lookup in self.relation_prefetches.items()
+            if name in fieldset
+        ))
+        fields = [
+            self.fields[name] for name in fieldset
+            if name not in ('is_favorited', 'is_in_shopping_cart')
+        ]
+        result = {}
+        for recipe in recipes:
+            data = result[recipe.id] = {}
+            for field in fields:
+                attribute = field.get_attribute(recipe)
+                data[field.field_name] = (
+                    None if attribute is None
+                    else field.to_representation(attribute)
+                )
+        return result
 
 
 class LimitRecipesSerializer(serializers.ModelSerializer):
     image = Base64ImageField(required=False)
+    image_variants = ImageVariantsField()
 
     def validate(self, attrs):
         user = self.context['request'].user
@@ -144,10 +324,48 @@ class LimitRecipesSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
         read_only_fields = ('id', 'name', 'image', 'cooking_time')
 
 
+def get_recipe_previews(author_ids, limit=None):
+    """Последние рецепты авторов одним запросом: {author_id: [рецепты]}.
+
+    С ограничением limit по limit рецептов на автора выбирает
+    ROW_NUMBER() OVER (PARTITION BY author_id ORDER BY pub_date DESC).
+    """
+    previews = {author_id: [] for author_id in author_ids}
+    queryset = Recipe.objects.filter(author_id__in=author_ids)
+    if limit is not None:
+        ranked = queryset.annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()]
+        )).order_by()
+        sql, params = ranked.query.sql_with_params()
+        queryset = Recipe.objects.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE ranked.row_number <= %s '
+            f'ORDER BY ranked.pub_date DESC, ranked.id DESC',
+            (*params, limit)
+        )
+    for recipe in queryset:
+        previews[recipe.author_id].append(recipe)
+    return previews
+
+
+class FollowListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        if hasattr(data, 'all'):
+            data = data.all()
+        data = list(data)
+        self.context['recipe_previews'] = get_recipe_previews(
+            [follow.author_id for follow in data],
+            self.child.get_recipes_limit()
+        )
+        return super().to_representation(data)
+
+
 class FollowSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source='author.id')
     email = serializers.ReadOnlyField(source='author.email')
@@ -156,27 +374,44 @@ class FollowSerializer(serializers.ModelSerializer):
     last_name = serializers.ReadOnlyField(source='author.last_name')
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField(source='author.recipes_count')
 
     class Meta:
         model = Follow
         fields = ('id', 'email', 'username', 'first_name', 'last_name',
                   'is_subscribed', 'recipes', 'recipes_count')
+        list_serializer_class = FollowListSerializer
+
+    def get_recipes_limit(self):
+        limit = self.context['request'].GET.get('recipes_limit')
+        return int(limit) if limit else None
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        return user.followers.all().exists()
+        return obj.author_id in get_followed_authors(
+            self.context.get('request')
+        )
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        queryset = Recipe.objects.filter(author=obj.author)
-        if limit:
-            queryset = queryset[:int(limit)]
-        return LimitRecipesSerializer(queryset, many=True).data
-
-    def get_recipes_count(self, obj):
-        return obj.author.recipes.all().count()
+        previews = self.context.get('recipe_previews')
+        if previews is None or obj.author_id not in previews:
+            previews = get_recipe_previews(
+                [obj.author_id], self.get_recipes_limit()
+            )
+        return LimitRecipesSerializer(
+            previews[obj.author_id], many=True
+        ).data
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для пакетных операций."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=const.MAX_BATCH_RECIPES
+    )
+
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
 
 
 class CartSerializer(serializers.ModelSerializer):
@@ -0,0 +1,138 @@
+import csv
+import json
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from .models import Cart, IngredientAmount, ShoppingListItem
+
+CONTENT_TYPES = {
+    'txt': 'text/plain; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+
+
+def get_recipe_amounts(recipe_id):
+    """Количество каждого ингредиента рецепта: {ingredient_id: amount}."""
+    return dict(IngredientAmount.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('ingredient_id', 'amount'))
+
+
+def get_recipes_amounts(recipe_ids):
+    """Суммарное количество ингредиентов нескольких рецептов."""
+    return dict(IngredientAmount.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values('ingredient_id').annotate(
+        total=Sum('amount')
+    ).order_by().values_list('ingredient_id', 'total'))
+
+
+def apply_amounts(user_ids, amounts):
+    """Прибавляет amounts к спискам покупок пользователей.
+
+    Отрицательные значения вычитаются; позиции, количество которых стало
+    нулевым, удаляются.
+    """
+    amounts = {key: value for key, value in amounts.items() if value}
+    user_ids = list(user_ids)
+    if not amounts or not user_ids:
+        return
+    with transaction.atomic():
+        ShoppingListItem.objects.bulk_create(
+            (ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id)
+             for user_id in user_ids for ingredient_id in amounts),
+            ignore_conflicts=True
+        )
+        items = ShoppingListItem.objects.filter(
+            user_id__in=user_ids, ingredient_id__in=amounts
+        )
+        items.update(total_amount=F('total_amount') + Case(
+            *(When(ingredient_id=ingredient_id, then=Value(amount))
+              for ingredient_id, amount in amounts.items()),
+            output_field=IntegerField()
+        ))
+        items.filter(total_amount__lte=0).delete()
+
+
+def add_recipe(user_ids, recipe_id):
+    apply_amounts(user_ids, get_recipe_amounts(recipe_id))
+
+
+def remove_recipe(user_ids, recipe_id):
+    apply_amounts(user_ids, {
+        ingredient_id: -amount
+        for ingredient_id, amount in get_recipe_amounts(recipe_id).items()
+    })
+
+
+def add_recipes(user_id, recipe_ids):
+    apply_amounts([user_id], get_recipes_amounts(recipe_ids))
+
+
+def change_recipe(recipe_id, old_amounts, new_amounts):
+    """Переносит изменение состава рецепта в списки покупок."""
+    delta = {
+        ingredient_id: (new_amounts.get(ingredient_id, 0)
+                        - old_amounts.get(ingredient_id, 0))
+        for ingredient_id in old_amounts.keys() | new_amounts.keys()
+    }
+    apply_amounts(
+        Cart.objects.filter(
+            model_to_subscribe_id=recipe_id
+        ).values_list('user_id', flat=True),
+        delta
+    )
+
+
+def get_shopping_list(user):
+    """Список покупок пользователя, отсортированный по ингредиенту."""
+    return ShoppingListItem.objects.filter(user=user).values(
+        'ingredient__name', 'ingredient__measurement_unit', 'total_amount'
+    ).order_by('ingredient__name', 'ingredient__measurement_unit')
+
+
+def _rows(items):
+    for item in items:
+        yield (item['ingredient__name'],
+               item['ingredient__measurement_unit'],
+               item['total_amount'])
+
+
+class _Echo:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def render_txt(items):
+    for name, unit, amount in _rows(items):
+        yield f'{name} - {amount} {unit}\n'
+
+
+def render_csv(items):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for row in _rows(items):
+        yield writer.writerow(row)
+
+
+def render_json(items):
+    yield '['
+    separator = ''
+    for name, unit, amount in _rows(items):
+        yield separator + json.dumps(
+            {'name': name, 'measurement_unit': unit, 'amount': amount},
+            ensure_ascii=False
+        )
+        separator = ','
+    yield ']'
+
+
+RENDERERS = {
+    'txt': render_txt,
+    'csv': render_csv,
+    'json': render_json,
+}
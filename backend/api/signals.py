@@ -0,0 +1,180 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from users.models import Follow, User
+from . import (counters, feed, images, recipe_cache, search, shopping_cart,
+               tag_masks, versions)
+from .models import Cart, Favorite, Ingredient, IngredientAmount, Recipe, Tag
+
+
+@receiver(post_save, sender=Cart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        shopping_cart.add_recipe(
+            [instance.user_id], instance.model_to_subscribe_id
+        )
+
+
+@receiver(pre_delete, sender=Cart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    shopping_cart.remove_recipe(
+        [instance.user_id], instance.model_to_subscribe_id
+    )
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    versions.bump(versions.TAGS, versions.CATALOG)
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def bump_ingredients_version(sender, **kwargs):
+    versions.bump(versions.INGREDIENTS, versions.CATALOG)
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def bump_recipes_version(sender, **kwargs):
+    versions.bump(versions.RECIPES)
+
+
+@receiver([post_save, post_delete], sender=User)
+def bump_catalog_version(sender, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    versions.bump(versions.CATALOG)
+
+
+@receiver([post_save, post_delete], sender=Favorite)
+@receiver([post_save, post_delete], sender=Cart)
+@receiver([post_save, post_delete], sender=Follow)
+def bump_user_version(sender, instance, **kwargs):
+    versions.bump(versions.user_key_by_id(instance.user_id))
+
+
+@receiver(post_save, sender=Recipe)
+def create_image_variants(sender, instance, **kwargs):
+    images.schedule_variants(instance)
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def invalidate_recipe_cache(sender, instance, **kwargs):
+    recipe_cache.invalidate(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=IngredientAmount)
+def invalidate_recipe_cache_by_amount(sender, instance, **kwargs):
+    # Только кэш: удаление записи по коммиту не обращается к базе, а
+    # поисковый индекс обновляется один раз на рецепт там, где меняется
+    # состав (сериализатор, админка).
+    recipe_cache.invalidate(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_cache_by_tags(sender, instance, action, reverse,
+                                    pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        recipe_cache.invalidate(instance.pk)
+    elif pk_set:
+        recipe_cache.invalidate(*pk_set)
+    else:
+        recipe_cache.clear()
+
+
+@receiver([post_save, post_delete], sender=Tag)
+@receiver([post_save, post_delete], sender=Ingredient)
+def clear_recipe_cache(sender, **kwargs):
+    recipe_cache.clear()
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_author_recipes(sender, instance, update_fields=None,
+                              **kwargs):
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    recipe_cache.invalidate(*instance.recipes.values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_tag_masks(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._cleared_recipes = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        tag_masks.update_masks([instance.pk])
+    elif pk_set:
+        tag_masks.update_masks(pk_set)
+    else:
+        tag_masks.update_masks(getattr(instance, '_cleared_recipes', []))
+
+
+@receiver(pre_delete, sender=Tag)
+def remove_tag_from_masks(sender, instance, **kwargs):
+    tag_masks.remove_tag(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe(sender, instance, **kwargs):
+    search.update_index([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def unindex_recipe(sender, instance, **kwargs):
+    search.delete_from_index([instance.pk])
+
+
+@receiver(pre_delete, sender=Ingredient)
+def collect_recipes_by_ingredient(sender, instance, **kwargs):
+    instance._recipe_ids = list(IngredientAmount.objects.filter(
+        ingredient=instance
+    ).values_list('recipe_id', flat=True))
+
+
+@receiver(post_delete, sender=Ingredient)
+def index_recipes_by_deleted_ingredient(sender, instance, **kwargs):
+    search.update_index(getattr(instance, '_recipe_ids', []))
+
+
+@receiver(post_save, sender=Ingredient)
+def index_recipes_by_ingredient(sender, instance, created, **kwargs):
+    if not created:
+        search.update_index(list(IngredientAmount.objects.filter(
+            ingredient=instance
+        ).values_list('recipe_id', flat=True)))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Follow)
+def increment_counters(sender, instance, created, **kwargs):
+    if created:
+        counters.row_changed(instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Follow)
+def decrement_counters(sender, instance, **kwargs):
+    counters.row_changed(instance, -1)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        feed.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_feed(sender, instance, **kwargs):
+    feed.prune(instance.user_id, instance.author_id)
@@ -0,0 +1,47 @@
+from django.db.models import F
+
+from .models import Recipe, Tag
+
+
+def get_mask(bits):
+    mask = 0
+    for bit in bits:
+        mask |= 1 << bit
+    return mask
+
+
+def update_masks(recipe_ids):
+    """Пересчитывает маски тэгов рецептов по связям в базе."""
+    recipe_ids = set(recipe_ids)
+    bits = {recipe_id: [] for recipe_id in recipe_ids}
+    for recipe_id, bit in Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'tag__bit'):
+        bits[recipe_id].append(bit)
+    for recipe_id, recipe_bits in bits.items():
+        Recipe.objects.filter(pk=recipe_id).update(
+            tag_mask=get_mask(recipe_bits)
+        )
+
+
+def remove_tag(tag):
+    """Снимает бит удаляемого тэга с рецептов."""
+    Recipe.objects.filter(tags=tag).update(
+        tag_mask=F('tag_mask') - (1 << tag.bit)
+    )
+
+
+def filter_recipes(queryset, slugs, match_all=False):
+    """Рецепты с любым (или со всеми) из тэгов slugs по маске.
+
+    Если нужны все тэги, а какого-то из них нет, рецептов нет.
+    """
+    slugs = set(slugs)
+    bits = dict(Tag.objects.filter(slug__in=slugs).values_list('slug', 'bit'))
+    mask = get_mask(bits.values())
+    if not mask or match_all and len(bits) < len(slugs):
+        return queryset.none()
+    queryset = queryset.alias(tags_matched=F('tag_mask').bitand(mask))
+    if match_all:
+        return queryset.filter(tags_matched=mask)
+    return queryset.exclude(tags_matched=0)
@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models import Count
+
+from users.models import User
+from . import counters, shopping_cart, versions
+from .models import Cart
+
+
+def lock_user(user):
+    """Блокирует строку пользователя до конца транзакции.
+
+    Избранное и корзина пользователя меняются только под этой блокировкой,
+    поэтому найденные до INSERT или DELETE строки не устаревают к их
+    выполнению, а побочные эффекты не применяются дважды.
+    """
+    list(User.objects.select_for_update().filter(
+        pk=user.pk
+    ).values_list('pk', flat=True))
+
+
+# Обработчики post_save избранного и корзины, которые заменяет
+# apply_side_effects; полноту списка проверяет системная проверка api.E002.
+BULK_CREATE_RECEIVERS = {
+    'api.signals.add_to_shopping_list',
+    'api.signals.bump_user_version',
+    'api.signals.increment_counters',
+}
+
+
+def apply_side_effects(model, user, rows):
+    """Побочные эффекты post_save для строк из bulk_create.
+
+    Пакетный INSERT сигналов не вызывает.
+    """
+    counters.rows_changed(rows, 1)
+    if model is Cart:
+        shopping_cart.add_recipes(
+            user.pk, [row.model_to_subscribe_id for row in rows]
+        )
+    versions.bump(versions.user_key(user))
+
+
+def add_recipes(model, user, recipe_ids):
+    """Добавляет рецепты в избранное или корзину одним INSERT.
+
+    Возвращает id рецептов, которых у пользователя еще не было.
+    """
+    with transaction.atomic():
+        lock_user(user)
+        existing = set(model.objects.filter(
+            user=user, model_to_subscribe_id__in=recipe_ids
+        ).values_list('model_to_subscribe_id', flat=True))
+        new_ids = [pk for pk in recipe_ids if pk not in existing]
+        if not new_ids:
+            return set()
+        # bulk_create не заполняет поле order_with_respect_to.
+        orders = dict(model.objects.filter(
+            model_to_subscribe_id__in=new_ids
+        ).values('model_to_subscribe_id').annotate(
+            total=Count('pk')
+        ).order_by().values_list('model_to_subscribe_id', 'total'))
+        rows = [
+            model(user=user, model_to_subscribe_id=pk,
+                  _order=orders.get(pk, 0))
+            for pk in new_ids
+        ]
+        model.objects.bulk_create(rows)
+        apply_side_effects(model, user, rows)
+    return set(new_ids)
+
+
+def remove_recipes(model, user, recipe_ids):
+    """Удаляет рецепты из избранного или корзины.
+
+    Возвращает id рецептов, которые были у пользователя. Удаление идет
+    через ORM, поэтому побочные эффекты выполняют сигналы каждой строки;
+    пакет ограничен MAX_BATCH_RECIPES.
+    """
+    with transaction.atomic():
+        lock_user(user)
+        rows = model.objects.filter(
+            user=user, model_to_subscribe_id__in=recipe_ids
+        )
+        removed = set(rows.values_list('model_to_subscribe_id', flat=True))
+        if removed:
+            rows.delete()
+    return removed
@@ -0,0 +1,50 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Now
+
+from .models import ResourceVersion
+
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+RECIPES = 'recipes'
+# Данные, вложенные в рецепты: тэги, ингредиенты и профили авторов.
+CATALOG = 'catalog'
+
+
+def user_key(user):
+    """Ресурс с отметками пользователя: избранное, корзина, подписки."""
+    if user is None or user.is_anonymous:
+        return 'user:anonymous'
+    return f'user:{user.pk}'
+
+
+def user_key_by_id(user_id):
+    return f'user:{user_id}'
+
+
+def bump(*names):
+    """Увеличивает версии ресурсов."""
+    with transaction.atomic():
+        ResourceVersion.objects.bulk_create(
+            (ResourceVersion(name=name) for name in names),
+            ignore_conflicts=True
+        )
+        ResourceVersion.objects.filter(name__in=names).update(
+            version=F('version') + 1, updated_at=Now()
+        )
+
+
+def get_versions(names):
+    """Версии ресурсов одним запросом: {ресурс: (версия, дата)}."""
+    versions = {name: (0, None) for name in names}
+    versions.update(
+        (name, (version, updated_at))
+        for name, version, updated_at in ResourceVersion.objects.filter(
+            name__in=names
+        ).values_list('name', 'version', 'updated_at')
+    )
+    return versions
+
+
+def get_version(name):
+    return get_versions([name])[name][0]
@@ -1,4 +1,6 @@
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Value
+from django.http import Http404, StreamingHttpResponse
 from django_filters import rest_framework as f
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
@@ -6,32 +8,120 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from users.permissions import IsAuthorOrReadOnly
-from . import serializers
-from .filters import IngredientFilter, RecipeFilter
-from .models import Cart, Favorite, Ingredient, Recipe, Tag
-from .pagination import CustomPagination
+from . import (const, fieldsets, serializers, shopping_cart, user_recipes,
+               versions)
+from .feed import FeedPagination
+from .filters import RecipeFilter
+from .ingredient_index import ingredient_index
+from .mixins import ConditionalGetMixin
+from .models import Cart, Favorite, FeedItem, Ingredient, Recipe, Tag
+from .pagination import OptionalCursorPagination
+from .renderers import CSVRenderer, FastJSONRenderer, PlainTextRenderer
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = serializers.TagsSerializer
+    query_budgets = {'list': 2, 'retrieve': 2}
 
+    def get_version_names(self, request, detail):
+        return [versions.TAGS]
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+
+class IngredientViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientsSerializer
-    filter_backends = (IngredientFilter,)
-    search_fields = ('^name',)
+    query_budgets = {'list': 3, 'retrieve': 2}
+
+    def get_version_names(self, request, detail):
+        return [versions.INGREDIENTS]
+
+    def list(self, request, *args, **kwargs):
+        if not request.query_params.get('name'):
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(
+            request, self.search, False, *args, **kwargs
+        )
+
+    def search(self, request, *args, **kwargs):
+        return Response(ingredient_index.search(
+            request.query_params['name'], const.INGREDIENT_SEARCH_LIMIT
+        ))
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all().prefetch_related(
-        'ingredientamount_set__ingredient'
-    )
+class RecipeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Recipe.objects.select_related('author')
     permission_classes = [IsAuthorOrReadOnly]
-    pagination_class = CustomPagination
+    pagination_class = OptionalCursorPagination
     filter_backends = (f.DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    vary_on_user = True
+    query_budgets = {'list': 8, 'retrieve': 7, 'feed': 8}
+    # Колонки рецепта, которые читают поля представления.
+    field_columns = {
+        'author': ('author',),
+        'name': ('name',),
+        'image': ('image',),
+        'image_variants': ('image', 'image_variants'),
+        'text': ('text',),
+        'cooking_time': ('cooking_time',),
+    }
+
+    def get_version_names(self, request, detail):
+        names = [versions.CATALOG, versions.user_key(request.user)]
+        if not detail:
+            names.append(versions.RECIPES)
+        return names
+
+    def get_object_last_modified(self, request):
+        updated_at = Recipe.objects.filter(
+            pk=self.kwargs['pk']
+        ).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            raise Http404
+        return updated_at
+
+    def get_fieldset(self):
+        """Дерево выбранных полей ответа или None для полного ответа."""
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = None
+            if self.request.method == 'GET':
+                paths = fieldsets.get_requested_paths(self.request)
+                if paths:
+                    self._fieldset = fieldsets.build_tree(
+                        paths, serializers.GetRecipesSerializer().fields
+                    )
+        return self._fieldset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fieldset'] = self.get_fieldset()
+        return context
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            if 'author' not in fieldset:
+                queryset = queryset.select_related(None)
+            queryset = queryset.only('id', 'pub_date', 'updated_at', *(
+                column for name in fieldset
+                for column in self.field_columns.get(name, ())
+            ))
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False)
+            )
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, model_to_subscribe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(Cart.objects.filter(
+                user=user, model_to_subscribe=OuterRef('pk')
+            ))
+        )
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -55,37 +145,46 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post', 'delete'],
             permission_classes=[IsAuthenticated], url_name='favorite',
             url_path='favorite')
+    @transaction.atomic
     def favorite(self, request, pk=None):
         recipe = self.get_object()
+        user_recipes.lock_user(request.user)
 
         if request.method == 'POST':
-            Favorite.objects.create(
+            favorite, created = Favorite.objects.get_or_create(
                 user=request.user,
                 model_to_subscribe=recipe
             )
+            if not created:
+                return Response(
+                    {'errors': 'Рецепт уже в избранном.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             serializer = serializers.LimitRecipesSerializer(recipe)
             return Response(
                 serializer.data,
                 status=status.HTTP_201_CREATED
             )
 
-        if not recipe.favorites.all().exists():
+        favorite = Favorite.objects.filter(
+            user=request.user,
+            model_to_subscribe=recipe
+        ).first()
+        if favorite is None:
             return Response(
                 {'errors': 'Рецепт не найден в избранном.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        favorite = Favorite.objects.get(
-            user=request.user,
-            model_to_subscribe=recipe
-        )
         favorite.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=['post', 'delete'],
             permission_classes=[IsAuthenticated],
             url_name='shopping_cart', url_path='shopping_cart')
+    @transaction.atomic
     def shopping_cart(self, request, pk=None):
         recipe = self.get_object()
+        user_recipes.lock_user(request.user)
         user = request.user
 
         if request.method == 'POST':
@@ -117,30 +216,82 @@ class RecipeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    def change_recipes(self, request, model):
+        """Пакетное добавление (POST) или удаление (DELETE) рецептов.
+
+        В ответе — итог для каждого id: added/exists при добавлении,
+        removed/absent при удалении, not_found для несуществующих рецептов.
+        """
+        serializer = serializers.RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        found = set(Recipe.objects.filter(pk__in=ids).values_list(
+            'pk', flat=True
+        ))
+        found_ids = [pk for pk in ids if pk in found]
+        if request.method == 'POST':
+            changed = user_recipes.add_recipes(model, request.user, found_ids)
+            statuses = ('added', 'exists')
+        else:
+            changed = user_recipes.remove_recipes(
+                model, request.user, found_ids
+            )
+            statuses = ('removed', 'absent')
+        return Response({'results': [
+            {
+                'id': pk,
+                'status': 'not_found' if pk not in found
+                else statuses[pk not in changed]
+            }
+            for pk in ids
+        ]})
+
+    @action(detail=False, methods=['post', 'delete'],
+            permission_classes=[IsAuthenticated],
+            url_name='favorite-batch', url_path='favorite')
+    def favorite_batch(self, request):
+        return self.change_recipes(request, Favorite)
+
+    @action(detail=False, methods=['post', 'delete'],
+            permission_classes=[IsAuthenticated],
+            url_name='shopping-cart-batch', url_path='shopping_cart')
+    def shopping_cart_batch(self, request):
+        return self.change_recipes(request, Cart)
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated],
+            pagination_class=FeedPagination)
+    def feed(self, request):
+        """Новые рецепты авторов, на которых подписан пользователь."""
+        page = self.paginate_queryset(
+            FeedItem.objects.filter(user=request.user)
+        )
+        recipes = self.get_queryset().in_bulk(
+            [item.recipe_id for item in page]
+        )
+        serializer = self.get_serializer(
+            [recipes[item.recipe_id] for item in page
+             if item.recipe_id in recipes],
+            many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
     @action(detail=False, methods=['get'],
             permission_classes=[IsAuthenticated],
+            renderer_classes=[PlainTextRenderer, CSVRenderer,
+                              FastJSONRenderer],
             url_name='download_shopping_cart',
             url_path='download_shopping_cart')
     def download_shopping_cart(self, request):
-        user = request.user
-        cart_items = Cart.objects.filter(user=user)
-
-        response = HttpResponse(content_type='text/plain')
-        type_name = 'attachment; filename="shopping_cart.txt"'
-        response['Content-Disposition'] = type_name
-
-        shopping_dict = {}
-        for item in cart_items:
-            for ingr in item.model_to_subscribe.ingredientamount_set.all():
-                ingredient_name = ingr.ingredient.name
-                amount = ingr.amount
-                if ingredient_name in shopping_dict.keys():
-                    amount += shopping_dict[ingredient_name]
-                    shopping_dict[ingredient_name] = amount
-                shopping_dict[ingredient_name] = amount
-
-        for key in shopping_dict:
-            ingr = Ingredient.objects.get(name=key)
-            response.write(f"{key} - {shopping_dict[key]} "
-                           f"{ingr.measurement_unit}\n")
+        file_format = request.accepted_renderer.format
+        # Строки читаются до ответа: под ASGI тело потокового ответа
+        # отдается из цикла событий, где обращаться к базе нельзя.
+        items = list(shopping_cart.get_shopping_list(request.user))
+        response = StreamingHttpResponse(
+            shopping_cart.RENDERERS[file_format](items),
+            content_type=shopping_cart.CONTENT_TYPES[file_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_cart.{file_format}"'
+        )
         return response
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+# Списки и карточки рецептов, тэги, ингредиенты и подписки
+# обслуживаются асинхронными обработчиками.
+os.environ.setdefault('ROOT_URLCONF', 'foodgram.asgi_urls')
 
 application = get_asgi_application()
@@ -0,0 +1,25 @@
+from django.urls import URLPattern, include, path
+
+from api.async_views import async_view
+from . import urls
+
+ASYNC_ROUTES = (
+    'tags-list', 'tags-detail',
+    'ingredients-list', 'ingredients-detail',
+    'recipes-list', 'recipes-detail',
+    'users-subscriptions',
+)
+
+
+def make_async(pattern):
+    if pattern.name not in ASYNC_ROUTES:
+        return pattern
+    return URLPattern(
+        pattern.pattern, async_view(pattern.callback),
+        pattern.default_args, pattern.name
+    )
+
+
+urlpatterns = [
+    path('api/', include([make_async(url) for url in urls.router.urls])),
+] + urls.urlpatterns
@@ -29,6 +29,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.QueryBudgetMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -38,7 +40,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'foodgram.urls'
+ROOT_URLCONF = os.getenv('ROOT_URLCONF', default='foodgram.urls')
 
 TEMPLATES = [
     {
@@ -69,6 +71,51 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Представления рецептов. Удаление записей при правке видно только
+    # процессу, который ее сделал: при WEB_CONCURRENCY > 1 нужен общий кэш
+    # (системная проверка api.E001), а TIMEOUT ограничивает время, пока
+    # другие процессы (админка, команды) могут отдавать старые данные.
+    'recipes': {
+        'BACKEND': os.getenv('RECIPE_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('RECIPE_CACHE_LOCATION', default='recipes'),
+        'TIMEOUT': int(os.getenv('RECIPE_CACHE_TIMEOUT', default=300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('RECIPE_CACHE_MAX_ENTRIES', default=1000)),
+        },
+    },
+    # Пользователи по токенам. TIMEOUT — наибольшая задержка, с которой
+    # выход из системы или удаление пользователя доходит до воркера,
+    # не получившего удаление записи. Локальный кэш (LocMemCache) есть
+    # у каждого воркера свой, поэтому при WEB_CONCURRENCY > 1 нужен общий
+    # кэш (Redis, Memcached): это проверяет системная проверка users.E001.
+    'auth': {
+        'BACKEND': os.getenv('AUTH_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('AUTH_CACHE_LOCATION', default='auth'),
+        'TIMEOUT': int(os.getenv('AUTH_CACHE_TIMEOUT', default=10)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('AUTH_CACHE_MAX_ENTRIES', default=10000)),
+        },
+    },
+}
+
+# Число процессов-воркеров; по этой же переменной его берет gunicorn.
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', default=1))
+
+QUERY_BUDGET_ENABLED = os.getenv(
+    'QUERY_BUDGET_ENABLED', default='false'
+).lower() == 'true'
+
+ASYNC_ORM_WORKERS = int(os.getenv('ASYNC_ORM_WORKERS', default=8))
+
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', default=1024))
+COMPRESSION_BROTLI_QUALITY = int(
+    os.getenv('COMPRESSION_BROTLI_QUALITY', default=5)
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -105,7 +152,16 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
@@ -1,11 +1,21 @@
 from django.contrib import admin
 
+from api.admin import LargeTableAdmin
 from .models import Follow, User
 
 
-class UserAdmin(admin.ModelAdmin):
-    list_filter = ('email', 'username',)
+class UserAdmin(LargeTableAdmin):
+    list_display = ('id', 'username', 'email', 'recipes_count',
+                    'followers_count',)
+    list_filter = ('role',)
+    search_fields = ('^username', '^email',)
+
+
+class FollowAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'author',)
+    list_select_related = ('user', 'author',)
+    autocomplete_fields = ('user', 'author',)
 
 
 admin.site.register(User, UserAdmin)
-admin.site.register(Follow)
+admin.site.register(Follow, FollowAdmin)
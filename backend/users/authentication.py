@@ -0,0 +1,40 @@
+import hashlib
+
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+
+CACHE_ALIAS = 'auth'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def cache_key(key):
+    """Ключ кэша по хэшу токена, чтобы сам токен не попадал в кэш."""
+    return f'token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def invalidate(*keys):
+    """Удаляет пользователей токенов из кэша после коммита транзакции."""
+    cache_keys = [cache_key(key) for key in keys]
+    if cache_keys:
+        transaction.on_commit(lambda: get_cache().delete_many(cache_keys))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к базе для известных токенов.
+
+    Токен вместе с пользователем хранится в кэше auth с ограниченным
+    временем жизни; записи удаляются при удалении токена (выход из
+    системы), а также при сохранении или удалении пользователя.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_cache()
+        token = cache.get(cache_key(key))
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key(key), token)
+        return token.user, token
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+
+from .authentication import get_cache
+
+
+@register(Tags.caches)
+def check_auth_cache(app_configs, **kwargs):
+    """Кэш токенов должен быть общим, если воркеров несколько.
+
+    Иначе удаление токена или пользователя видно только одному воркеру,
+    а остальные пускают по старому токену до истечения TIMEOUT.
+    """
+    if settings.WEB_CONCURRENCY > 1 and isinstance(get_cache(), LocMemCache):
+        return [Error(
+            'Кэш auth локален для процесса, а воркеров '
+            f'{settings.WEB_CONCURRENCY}.',
+            hint='Укажите общий кэш в AUTH_CACHE_BACKEND и '
+                 'AUTH_CACHE_LOCATION (Redis, Memcached).',
+            id='users.E001',
+        )]
+    return []
@@ -45,6 +45,16 @@ class User(AbstractUser):
         blank=True,
         max_length=5
     )
+    recipes_count = models.PositiveIntegerField(
+        'Число рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('id',)
@@ -3,6 +3,21 @@ from rest_framework import serializers
 from .models import User
 
 
+def get_followed_authors(request):
+    """Id авторов, на которых подписан текущий пользователь.
+
+    Загружается одним запросом и кэшируется на объекте запроса, чтобы все
+    сериализаторы пользователей использовали общий результат.
+    """
+    if request is None or request.user.is_anonymous:
+        return frozenset()
+    if not hasattr(request, '_followed_authors'):
+        request._followed_authors = frozenset(
+            request.user.following.values_list('author_id', flat=True)
+        )
+    return request._followed_authors
+
+
 class BaseUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -18,7 +33,7 @@ class GetUserSerializer(serializers.ModelSerializer):
                   'last_name', 'is_subscribed')
 
     def get_is_subscribed(self, obj):
-        return obj.followers.all().exists()
+        return obj.id in get_followed_authors(self.context.get('request'))
 
 
 class CreateUserSerializer(serializers.ModelSerializer):
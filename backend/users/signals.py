@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import authentication
+from .models import User
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    authentication.invalidate(instance.key)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    authentication.invalidate(*Token.objects.filter(
+        user_id=instance.pk
+    ).values_list('key', flat=True))
@@ -6,7 +6,7 @@ from rest_framework.response import Response
 from djoser.serializers import SetPasswordSerializer
 from djoser.views import UserViewSet
 
-from api.pagination import CustomPagination
+from api.pagination import CustomPagination, SubscriptionPagination
 from api.serializers import FollowSerializer
 from .models import Follow, User
 from .permissions import RegistrationOrReadOnly
@@ -18,6 +18,7 @@ class UserViewSet(UserViewSet):
     queryset = User.objects.all()
     permission_classes = [RegistrationOrReadOnly]
     pagination_class = CustomPagination
+    query_budgets = {'list': 3, 'retrieve': 2, 'me': 1, 'subscriptions': 4}
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -61,10 +62,13 @@ class UserViewSet(UserViewSet):
             status=status.HTTP_200_OK
         )
 
-    @action(detail=False, permission_classes=[IsAuthenticated])
+    @action(detail=False, permission_classes=[IsAuthenticated],
+            pagination_class=SubscriptionPagination)
     def subscriptions(self, request):
         user = request.user
-        subscriptions = Follow.objects.filter(user=user)
+        subscriptions = Follow.objects.filter(
+            user=user
+        ).select_related('author').order_by('id')
         pages = self.paginate_queryset(subscriptions)
         response = FollowSerializer(pages, many=True,
                                     context={'request': request})